@@ -1,35 +1,337 @@
 """
 Utilities for Speech Emotion Recognition (SER) using a pretrained Hugging Face model.
 
-This module loads the model once at startup and exposes a simple
+This module loads the model once per process and exposes a simple
 `analyze_emotion_from_wav_bytes` function that takes WAV bytes and
 returns the top emotion labels.
 """
 
 from typing import List, Dict, Optional
+from collections import OrderedDict
+from importlib.util import find_spec
+from math import gcd
 from pathlib import Path
-import tempfile
+import hashlib
+import io
+import os
+import threading
 
-from transformers import pipeline
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
 
+from batching import MicroBatcher
+from model_files import save_model_dir
+
+# torch, transformers and optimum take seconds to import, so they are only
+# imported when the classifier is first loaded, not when this module is.
+ORT_AVAILABLE = find_spec("onnxruntime") is not None and find_spec("optimum") is not None
+
+
+MODEL_NAME = "superb/hubert-large-superb-er"
+
+# Local directory for exported/converted model artifacts.
+MODELS_DIR = Path(__file__).resolve().parent / "models"
+LOCAL_MODEL_DIR = MODELS_DIR / "hubert-er"
+ONNX_MODEL_DIR = MODELS_DIR / "hubert-er-onnx"
+
+# Sampling rate expected by the HuBERT feature extractor.
+TARGET_SAMPLE_RATE = 16000
+
+# Number of clips the pipeline groups into a single forward pass.
+BATCH_SIZE = 8
+# How long a request waits for concurrent clips to share its forward pass.
+BATCH_MAX_WAIT_SECONDS = 0.02
+
+# Upper bound on classifier forwards running at once across request threads.
+MAX_CONCURRENT_INFERENCES = 2
 
 _audio_classifier = None
+_audio_classifier_lock = threading.Lock()
+_inference_slots = threading.BoundedSemaphore(MAX_CONCURRENT_INFERENCES)
+
+# Small LRU of recent predictions keyed by (content hash, top_k), so that
+# re-submitting the same recording skips the HuBERT forward pass.
+_PREDICTION_CACHE_SIZE = 64
+_prediction_cache: "OrderedDict[tuple, List[Dict]]" = OrderedDict()
+_prediction_cache_lock = threading.Lock()
 
 
 def _get_audio_classifier():
     """
-    Lazily load the Hugging Face audio classification pipeline.
+    Lazily load the audio emotion classifier.
     Uses a model trained for emotion recognition on speech.
+
+    The classifier is a process-wide singleton; the lock makes sure concurrent
+    first requests don't each deserialize their own copy of the weights.
+    On CPU an ONNX Runtime session is used when `optimum[onnxruntime]` is
+    installed, otherwise (or if it fails to load) the Hugging Face pipeline
+    is used.
     """
     global _audio_classifier
     if _audio_classifier is None:
+        with _audio_classifier_lock:
+            if _audio_classifier is None:
+                import torch
+
+                clf = None
+                if ORT_AVAILABLE and not torch.cuda.is_available():
+                    try:
+                        clf = _load_onnx_classifier()
+                    except Exception as e:
+                        print(f"ONNX audio emotion model failed to load, using PyTorch: {e}")
+                if clf is None:
+                    clf = _load_pipeline_classifier()
+                # Run one dummy forward so kernel selection and allocator
+                # warm-up happen here rather than on the first user request.
+                silence = np.zeros(TARGET_SAMPLE_RATE, dtype=np.float32)
+                _run_classifier(clf, {"array": silence, "sampling_rate": TARGET_SAMPLE_RATE}, top_k=1)
+                _audio_classifier = clf
+    return _audio_classifier
+
+
+def preload_audio_classifier() -> None:
+    """
+    Load and warm up the classifier ahead of the first request.
+
+    Safe to call from a background thread; requests that arrive while it is
+    running wait on the same lock instead of loading a second copy.
+    """
+    try:
+        _get_audio_classifier()
+    except Exception as e:
+        print(f"Audio emotion model preload failed: {str(e)}")
+
+
+def _load_pipeline_classifier():
+    """
+    Load the Hugging Face audio classification pipeline.
+
+    The first FP32 run saves the model and feature extractor as safetensors
+    under LOCAL_MODEL_DIR, and later runs load from there. On a CUDA GPU the
+    model runs in FP16; on CPU the Linear layers are dynamically quantized to
+    int8, which cuts weight memory ~4x and speeds up the bandwidth-bound matmuls.
+    """
+    import torch
+    from transformers import pipeline
+
+    if torch.cuda.is_available():
+        device, dtype = 0, torch.float16
+    elif torch.backends.mps.is_available():
+        # MPS FP16 support for the conv feature encoder is uneven, stay in FP32
+        device, dtype = "mps", torch.float32
+    else:
+        device, dtype = -1, torch.float32
+
+    if (LOCAL_MODEL_DIR / "model.safetensors").exists():
+        # Load the local safetensors copy: weights are memory-mapped instead of
+        # unpickled, and there is no hub round-trip to validate the cache.
+        clf = pipeline(
+            "audio-classification",
+            model=str(LOCAL_MODEL_DIR),
+            batch_size=BATCH_SIZE,
+            device=device,
+            torch_dtype=dtype,
+            model_kwargs={"use_safetensors": True, "local_files_only": True},
+        )
+    else:
         # This model is relatively lightweight but still powerful for SER.
-        # It may download on first run.
-        _audio_classifier = pipeline(
+        # It downloads on first run, then is saved locally for later starts.
+        clf = pipeline(
             "audio-classification",
-            model="superb/hubert-large-superb-er",
+            model=MODEL_NAME,
+            batch_size=BATCH_SIZE,
+            device=device,
+            torch_dtype=dtype,
         )
-    return _audio_classifier
+        # Only an FP32 load is cached, so the local copy is always the
+        # original checkpoint; FP16 runs keep loading from the hub cache.
+        if dtype == torch.float32:
+            save_model_dir(
+                LOCAL_MODEL_DIR,
+                lambda path: clf.save_pretrained(path, safe_serialization=True),
+            )
+
+    if device == -1:
+        clf.model = _quantize_for_cpu(clf.model)
+    return clf
+
+
+def _load_onnx_classifier():
+    """
+    Load the model as an ONNX Runtime session with all graph optimizations.
+
+    The first run exports the checkpoint to ONNX and saves it under
+    ONNX_MODEL_DIR; later runs load the exported graph directly.
+    """
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForAudioClassification
+    from transformers import AutoFeatureExtractor
+
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session_options.intra_op_num_threads = os.cpu_count() or 1
+
+    if (ONNX_MODEL_DIR / "model.onnx").exists():
+        model = ORTModelForAudioClassification.from_pretrained(
+            ONNX_MODEL_DIR,
+            provider="CPUExecutionProvider",
+            session_options=session_options,
+        )
+        feature_extractor = AutoFeatureExtractor.from_pretrained(ONNX_MODEL_DIR)
+    else:
+        model = ORTModelForAudioClassification.from_pretrained(
+            MODEL_NAME,
+            export=True,
+            provider="CPUExecutionProvider",
+            session_options=session_options,
+        )
+        feature_extractor = AutoFeatureExtractor.from_pretrained(MODEL_NAME)
+
+        def save(path):
+            model.save_pretrained(path)
+            feature_extractor.save_pretrained(path)
+
+        save_model_dir(ONNX_MODEL_DIR, save)
+
+    return _OnnxAudioClassifier(model, feature_extractor)
+
+
+class _OnnxAudioClassifier:
+    """
+    Drop-in replacement for the audio-classification pipeline backed by
+    ONNX Runtime. Accepts a single {"array", "sampling_rate"} dict or a list
+    of them, and returns predictions in the same shape as the pipeline.
+    """
+
+    def __init__(self, model, feature_extractor):
+        self.model = model
+        self.feature_extractor = feature_extractor
+        self.id2label = model.config.id2label
+
+    def __call__(self, inputs, top_k: Optional[int] = None):
+        single = isinstance(inputs, dict)
+        items = [inputs] if single else list(inputs)
+
+        results = []
+        for start in range(0, len(items), BATCH_SIZE):
+            chunk = items[start:start + BATCH_SIZE]
+            features = self.feature_extractor(
+                [item["array"] for item in chunk],
+                sampling_rate=TARGET_SAMPLE_RATE,
+                padding=True,
+                return_tensors="np",
+            )
+            logits = np.asarray(self.model(**features).logits, dtype=np.float32)
+            results.extend(self._postprocess(row, top_k) for row in logits)
+
+        return results[0] if single else results
+
+    def _postprocess(self, logits: np.ndarray, top_k: Optional[int]) -> List[Dict]:
+        exp = np.exp(logits - logits.max())
+        probs = exp / exp.sum()
+        if top_k is not None and top_k < len(probs):
+            # Select the top_k in O(n), then sort just those k
+            order = np.argpartition(-probs, top_k - 1)[:top_k]
+            order = order[np.argsort(-probs[order])]
+        else:
+            order = np.argsort(-probs)
+        return [{"label": self.id2label[int(i)], "score": float(probs[i])} for i in order]
+
+
+def _quantize_for_cpu(model):
+    """
+    Dynamically quantize the model's Linear layers to int8 for CPU inference.
+    """
+    import torch
+
+    engines = torch.backends.quantized.supported_engines
+    if "fbgemm" in engines:
+        torch.backends.quantized.engine = "fbgemm"  # x86
+    elif "qnnpack" in engines:
+        torch.backends.quantized.engine = "qnnpack"  # ARM
+    else:
+        return model
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _decode_wav_bytes(wav_bytes: bytes) -> np.ndarray:
+    """
+    Decode WAV bytes in memory into a mono float32 array at TARGET_SAMPLE_RATE.
+    """
+    data, sample_rate = sf.read(io.BytesIO(wav_bytes), dtype="float32", always_2d=False)
+
+    # Collapse stereo/multi-channel recordings to mono
+    if data.ndim == 2:
+        data = data.mean(axis=1)
+
+    if sample_rate != TARGET_SAMPLE_RATE:
+        # Polyphase FIR resampling (e.g. 48k -> 16k is up=1, down=3) is several
+        # times faster than librosa's default kaiser_best for speech.
+        g = gcd(sample_rate, TARGET_SAMPLE_RATE)
+        data = resample_poly(data, TARGET_SAMPLE_RATE // g, sample_rate // g)
+
+    return np.ascontiguousarray(data, dtype=np.float32)
+
+
+def _run_classifier(clf, inputs, top_k: Optional[int]):
+    """
+    Run the classifier with autograd bookkeeping disabled.
+
+    Called from worker threads; at most MAX_CONCURRENT_INFERENCES forwards
+    run at once to bound GPU memory.
+    """
+    import torch
+
+    with _inference_slots, torch.inference_mode():
+        return clf(inputs, top_k=top_k)
+
+
+def _cache_key(wav_bytes: bytes, top_k: Optional[int]) -> tuple:
+    return (hashlib.blake2b(wav_bytes, digest_size=16).digest(), top_k)
+
+
+def _cache_get(key: tuple) -> Optional[List[Dict]]:
+    with _prediction_cache_lock:
+        cached = _prediction_cache.get(key)
+        if cached is None:
+            return None
+        _prediction_cache.move_to_end(key)
+        return [dict(p) for p in cached]
+
+
+def _cache_put(key: tuple, preds: List[Dict]) -> None:
+    with _prediction_cache_lock:
+        _prediction_cache[key] = [dict(p) for p in preds]
+        if len(_prediction_cache) > _PREDICTION_CACHE_SIZE:
+            _prediction_cache.popitem(last=False)
+
+
+def _classify_batch(items: List[tuple]) -> List[List[Dict]]:
+    """
+    Run the classifier over (inputs, top_k) pairs submitted by concurrent
+    requests, returning predictions in submission order.
+
+    Items are grouped by top_k, since one pipeline call takes a single top_k
+    for the whole batch.
+    """
+    clf = _get_audio_classifier()
+    groups: Dict[Optional[int], List[int]] = {}
+    for idx, (_, top_k) in enumerate(items):
+        groups.setdefault(top_k, []).append(idx)
+
+    results: List[Optional[List[Dict]]] = [None] * len(items)
+    for top_k, indices in groups.items():
+        preds = _run_classifier(clf, [items[i][0] for i in indices], top_k)
+        for i, p in zip(indices, preds):
+            results[i] = p
+    return results
+
+
+# Coalesces concurrent single-clip requests into batched pipeline calls
+_batching_classifier = MicroBatcher(
+    _classify_batch, BATCH_SIZE, BATCH_MAX_WAIT_SECONDS, name="audio-emotion-batcher"
+)
 
 
 def analyze_emotion_from_wav_bytes(wav_bytes: bytes, top_k: Optional[int] = None) -> List[Dict]:
@@ -43,25 +345,18 @@ def analyze_emotion_from_wav_bytes(wav_bytes: bytes, top_k: Optional[int] = None
     Returns:
         List of dicts with 'label' and 'score' keys.
     """
-    clf = _get_audio_classifier()
+    cache_key = _cache_key(wav_bytes, top_k)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
 
-    # On Windows, avoid NamedTemporaryFile(delete=True) while still open.
-    tmp_dir = tempfile.gettempdir()
-    tmp_path = Path(tmp_dir) / "echomind_audio_tmp.wav"
+    # Decode in memory and hand the samples straight to the pipeline, so there
+    # is no temp file to write, re-read and re-decode through ffmpeg.
+    audio = _decode_wav_bytes(wav_bytes)
+    # Batched with any clips from concurrent requests
+    preds = _batching_classifier.submit(
+        ({"array": audio, "sampling_rate": TARGET_SAMPLE_RATE}, top_k)
+    )
 
-    # Write bytes and close file before passing path to pipeline
-    with open(tmp_path, "wb") as f:
-        f.write(wav_bytes)
-
-    try:
-        preds = clf(str(tmp_path), top_k=top_k)
-    finally:
-        # Best-effort cleanup; ignore errors if file is in use
-        try:
-            tmp_path.unlink()
-        except OSError:
-            pass
+    _cache_put(cache_key, preds)
     return preds
-
-
-
@@ -0,0 +1,79 @@
+"""
+Micro-batching for model inference shared by the face and audio modules.
+
+Concurrent requests each submit one item; a worker thread collects items
+for up to a short wait window and hands them to a single batched call.
+"""
+
+from typing import Any, Callable, List, Sequence
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item requests into batched `run_batch` calls,
+    run on a dedicated worker thread.
+
+    `run_batch` receives a list of submitted items and must return one result
+    per item, in the same order. If it raises, every item in that batch gets
+    the exception.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int,
+        max_wait_seconds: float,
+        name: str = "micro-batcher",
+    ):
+        self._run_batch = run_batch
+        self._max_batch_size = max_batch_size
+        self._max_wait_seconds = max_wait_seconds
+        self._name = name
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, item: Any) -> Any:
+        """Process one item, blocking until its batch has been run."""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(
+                        target=self._run, name=self._name, daemon=True
+                    )
+                    self._worker.start()
+
+    def _next_batch(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self._max_wait_seconds
+        while len(batch) < self._max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                results = self._run_batch([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -1,24 +1,74 @@
 """
 Database setup and models for storing chat conversations.
 """
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float, JSON
+from sqlalchemy import create_engine, event, Column, Integer, String, DateTime, Text, Float, JSON, Index, insert, select, func, literal_column
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from datetime import datetime
+from typing import List, Optional
+import orjson
 import os
+import threading
+import time
 
 # Database file path
 DATABASE_URL = "sqlite:///./echomind_chats.db"
+# Same file, through the aiosqlite driver, for async request handlers
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./echomind_chats.db"
 
-# Create engine
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _json_serializer(obj) -> str:
+    return orjson.dumps(obj).decode("utf-8")
+
+
+# Create engines; JSON columns (emotion_data) go through orjson
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+)
+
+
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune every new SQLite connection for an append-heavy chat log.
+
+    WAL lets history reads proceed while a write is in progress, and
+    synchronous=NORMAL drops the fsync on every commit (still durable
+    across application crashes in WAL mode).
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    cursor.close()
+
+# Create session factory. Sessions are cheap (the engine pools the underlying
+# SQLite connections); expire_on_commit=False avoids re-SELECTing rows that a
+# handler reads back after committing.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Base class for models
 Base = declarative_base()
 
+# In-process cache of the total row count; the History page polls it on every
+# load, and COUNT(*) has to walk the whole table in SQLite.
+COUNT_CACHE_TTL_SECONDS = 5
+_count_cache = {"value": None, "expires_at": 0.0, "generation": 0}
+_count_cache_lock = threading.Lock()
+
 
 class ChatConversation(Base):
     """
@@ -35,28 +85,165 @@ class ChatConversation(Base):
     # Analytics fields
     sentiment_score = Column(Float, nullable=True)  # -1 to 1 (negative to positive)
     conversation_length = Column(Integer, nullable=True)  # Total character count
-    emotion_data = Column(JSON, nullable=True)  # For speech/facial emotion entries
+    emotion_data = Column(JSON(none_as_null=True), nullable=True)  # For speech/facial emotion entries
+
+    __table_args__ = (
+        # History filters by type and orders by time; equality column first
+        # lets SQLite walk the index in timestamp order without a sort step.
+        Index("ix_chat_conversations_tool_timestamp", "tool_called", "timestamp"),
+        # Sentiment range filters on /chats/filtered and the warning-sign check;
+        # also serves the "most positive" sort (SQLite puts NULLs last in DESC)
+        Index("ix_chat_conversations_sentiment_score", "sentiment_score"),
+        # "Longest" sort on /chats/filtered
+        Index("ix_chat_conversations_length", "conversation_length"),
+    )
 
     def __repr__(self):
         return f"<ChatConversation(id={self.id}, timestamp={self.timestamp})>"
 
 
+# Ascending sorts that keep NULLs last. SQLite only uses an expression index
+# when the ORDER BY expression matches it exactly (literals included), so
+# queries must order by these same objects.
+SENTIMENT_NULL_SORT_VALUE = 2
+LENGTH_NULL_SORT_VALUE = 999999999
+SENTIMENT_ASC_NULLS_LAST = func.coalesce(
+    ChatConversation.sentiment_score, literal_column(str(SENTIMENT_NULL_SORT_VALUE))
+)
+LENGTH_ASC_NULLS_LAST = func.coalesce(
+    ChatConversation.conversation_length, literal_column(str(LENGTH_NULL_SORT_VALUE))
+)
+
+Index("ix_chat_conversations_sentiment_nulls_last", SENTIMENT_ASC_NULLS_LAST)
+Index("ix_chat_conversations_length_nulls_last", LENGTH_ASC_NULLS_LAST)
+
+
 def init_db():
     """
     Initialize the database by creating all tables.
     """
     Base.metadata.create_all(bind=engine)
+    # create_all() skips tables that already exist, so indexes added after the
+    # table was first created have to be created explicitly. IF NOT EXISTS
+    # rather than checkfirst, which can't reflect expression indexes.
+    with engine.begin() as conn:
+        for index in ChatConversation.__table__.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
     print("Database initialized successfully!")
 
 
+async def insert_conversation_async(
+    db: AsyncSession,
+    user_message: str,
+    assistant_response: str,
+    tool_called: Optional[str] = None,
+    sentiment_score: Optional[float] = None,
+    conversation_length: Optional[int] = None,
+    emotion_data: Optional[dict] = None,
+) -> int:
+    """
+    Insert a single conversation row and commit it.
+
+    Uses a Core INSERT instead of adding an ORM object, so the write skips
+    the session's identity map and unit-of-work flush.
+
+    Returns:
+        The id of the new row.
+    """
+    result = await db.execute(
+        _conversation_insert(
+            user_message, assistant_response, tool_called,
+            sentiment_score, conversation_length, emotion_data,
+        )
+    )
+    await db.commit()
+    invalidate_conversation_count()
+    return result.inserted_primary_key[0]
+
+
+def _conversation_insert(
+    user_message, assistant_response, tool_called,
+    sentiment_score, conversation_length, emotion_data,
+):
+    """Build the Core INSERT for one conversation row, timestamped now."""
+    return insert(ChatConversation.__table__).values(
+        user_message=user_message,
+        assistant_response=assistant_response,
+        tool_called=tool_called,
+        timestamp=datetime.utcnow(),
+        sentiment_score=sentiment_score,
+        conversation_length=conversation_length,
+        emotion_data=emotion_data,
+    )
+
+
+async def insert_conversations_async(db: AsyncSession, rows: List[dict]) -> None:
+    """
+    Insert many conversation rows with a single executemany and one commit.
+
+    Each row is a dict of ChatConversation column values; `user_message` and
+    `assistant_response` are required, other columns default to NULL and
+    `timestamp` defaults to now.
+    """
+    if not rows:
+        return
+    now = datetime.utcnow()
+    params = [
+        {
+            "tool_called": None,
+            "sentiment_score": None,
+            "conversation_length": None,
+            "emotion_data": None,
+            "timestamp": now,
+            **row,
+        }
+        for row in rows
+    ]
+    await db.execute(insert(ChatConversation.__table__), params)
+    await db.commit()
+    invalidate_conversation_count()
+
+
+def count_conversations(db) -> int:
+    """
+    Return the total number of stored conversations.
+
+    The value is cached for COUNT_CACHE_TTL_SECONDS and dropped whenever
+    conversations are inserted or deleted through this module's helpers
+    (or invalidate_conversation_count() is called).
+    """
+    with _count_cache_lock:
+        if _count_cache["value"] is not None and _count_cache["expires_at"] > time.monotonic():
+            return _count_cache["value"]
+        generation = _count_cache["generation"]
+
+    count = db.execute(select(func.count()).select_from(ChatConversation.__table__)).scalar_one()
+
+    with _count_cache_lock:
+        # Skip caching if rows were added or removed while counting, since
+        # the count may predate that change
+        if _count_cache["generation"] == generation:
+            _count_cache["value"] = count
+            _count_cache["expires_at"] = time.monotonic() + COUNT_CACHE_TTL_SECONDS
+    return count
+
+
+def invalidate_conversation_count() -> None:
+    """Forget the cached conversation count after rows are added or removed."""
+    with _count_cache_lock:
+        _count_cache["value"] = None
+        _count_cache["generation"] += 1
+
+
 def get_db():
     """
     Dependency function to get database session.
+
+    One session per request; the connection it uses comes from the engine's
+    pool, so this does not open a new SQLite connection each time.
     """
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
-
-
@@ -5,59 +5,107 @@ This module combines face detection (MTCNN or Haar Cascade) with the high-accura
 dima806/facial_emotions_image_detection model for emotion classification.
 
 The hybrid approach:
-1. Detects faces in the image using MTCNN (preferred) or Haar Cascade (fallback)
+1. Detects faces in the image using MTCNN (GPU facenet-pytorch when available,
+   otherwise mtcnn-opencv) or Haar Cascade (fallback)
 2. Crops the largest detected face with padding
 3. Classifies emotions on the cropped face using the dima806 model
 """
 
 from typing import List, Dict, Optional
+from importlib.util import find_spec
 from pathlib import Path
 import tempfile
 import io
+import os
+import threading
 import numpy as np
 from PIL import Image
 
+from batching import MicroBatcher
+from model_files import save_model_dir
+
 try:
     import cv2
 except ImportError:
     cv2 = None
 
+try:
+    import av
+except ImportError:
+    av = None
+
 try:
     from mtcnn_opencv import MTCNN
     MTCNN_AVAILABLE = True
 except ImportError:
     MTCNN_AVAILABLE = False
 
-try:
-    from transformers import pipeline
-    TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
+# transformers is slow to import, so only check that it is installed here and
+# import it when the classifier is first loaded.
+TRANSFORMERS_AVAILABLE = find_spec("transformers") is not None
+
+# Optional ONNX Runtime backend for the emotion classifier
+ORT_AVAILABLE = find_spec("onnxruntime") is not None and find_spec("optimum") is not None
+
+# Optional GPU MTCNN (P/R/O-nets and NMS all run in torch); imported lazily
+# for the same reason as transformers.
+FACENET_AVAILABLE = find_spec("facenet_pytorch") is not None
+
+
+FER_MODEL_NAME = "dima806/facial_emotions_image_detection"
+
+# Local directory for the exported ONNX graph
+FER_ONNX_MODEL_DIR = Path(__file__).resolve().parent / "models" / "fer-onnx"
+
+# Faces are detected on a copy no larger than this on its long side
+DETECT_MAX_SIDE = 640
 
+# Run a lenient Haar Cascade before CPU MTCNN and skip MTCNN when it finds
+# no candidate. Haar misses some strongly turned faces, so this trades a
+# little recall on those for much cheaper rejection of faceless frames.
+HAAR_PREFILTER = True
+
+# Micro-batching: concurrent requests arriving within CLASSIFY_MAX_WAIT_SECONDS
+# of each other share one classifier forward pass of up to CLASSIFY_BATCH_SIZE.
+CLASSIFY_BATCH_SIZE = 8
+CLASSIFY_INPUT_SIZE = (224, 224)  # ViT input resolution (width, height)
+CLASSIFY_TOP_K = 5  # Number of emotion labels returned per face
+CLASSIFY_MAX_WAIT_SECONDS = 0.01
 
 # Global caches for lazy loading
 _face_detector = None
+_face_detector_kind = None  # "facenet", "mtcnn" or "haar"
+_haar_cascade = None
 _image_classifier = None
+_image_classifier_lock = threading.Lock()
 
 
 def _get_face_detector():
     """
-    Lazily load face detector. Prefers MTCNN, falls back to Haar Cascade.
+    Lazily load face detector. Prefers GPU MTCNN (facenet-pytorch) when CUDA
+    is available, then MTCNN (mtcnn-opencv), then falls back to Haar Cascade.
     
     Returns:
         Face detector object (MTCNN or Haar Cascade).
     """
-    global _face_detector
+    global _face_detector, _face_detector_kind
     if _face_detector is None:
-        if MTCNN_AVAILABLE:
+        if FACENET_AVAILABLE and _cuda_available():
+            from facenet_pytorch import MTCNN as TorchMTCNN
+
+            # Runs the whole detection cascade on the GPU
+            _face_detector = TorchMTCNN(
+                keep_all=False, select_largest=True, post_process=False, device="cuda"
+            )
+            _face_detector_kind = "facenet"
+        elif MTCNN_AVAILABLE:
             # Use MTCNN for better accuracy
             _face_detector = MTCNN()
+            _face_detector_kind = "mtcnn"
         elif cv2 is not None:
             # Fallback to Haar Cascade (built into OpenCV)
-            cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-            _face_detector = cv2.CascadeClassifier(cascade_path)
-            if _face_detector.empty():
-                raise RuntimeError("Failed to load Haar Cascade classifier")
+            _face_detector = _get_haar_cascade()
+            _face_detector_kind = "haar"
         else:
             raise ImportError(
                 "No face detector available. Install either:\n"
@@ -67,31 +115,269 @@ def _get_face_detector():
     return _face_detector
 
 
+def _get_haar_cascade():
+    """
+    Lazily load OpenCV's frontal-face Haar Cascade.
+    
+    Used as the detector of last resort, and as a cheap pre-check in front
+    of CPU MTCNN.
+    
+    Returns:
+        cv2.CascadeClassifier, or None if OpenCV is not installed.
+    """
+    global _haar_cascade
+    if _haar_cascade is None and cv2 is not None:
+        cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        cascade = cv2.CascadeClassifier(cascade_path)
+        if cascade.empty():
+            raise RuntimeError("Failed to load Haar Cascade classifier")
+        _haar_cascade = cascade
+    return _haar_cascade
+
+
+def _cuda_available() -> bool:
+    """Check for a CUDA device without importing torch when it isn't installed."""
+    if find_spec("torch") is None:
+        return False
+    import torch
+
+    return torch.cuda.is_available()
+
+
 def _get_image_classifier():
     """
     Lazily load the dima806 facial emotion classification model.
     
+    Uses an ONNX Runtime session when `optimum[onnxruntime]` is installed
+    (on its CUDA provider when available). Otherwise, or if that session
+    fails to load, the PyTorch model runs on the first CUDA GPU in FP16 when
+    one is available, or on CPU.
+    A dummy forward is run right after loading so kernel selection happens
+    before the first real request.
+    
     Returns:
-        Hugging Face pipeline for image classification.
+        _FaceEmotionClassifier wrapping the image processor and model.
     """
     global _image_classifier
     if _image_classifier is None:
-        if not TRANSFORMERS_AVAILABLE:
-            raise ImportError(
-                "transformers library not installed. Install with: pip install transformers"
-            )
-        # Load the dima806 facial emotion detection model
-        _image_classifier = pipeline(
-            "image-classification",
-            model="dima806/facial_emotions_image_detection"
-        )
+        with _image_classifier_lock:
+            if _image_classifier is None:
+                if not TRANSFORMERS_AVAILABLE:
+                    raise ImportError(
+                        "transformers library not installed. Install with: pip install transformers"
+                    )
+                classifier = None
+                onnx_provider = _onnx_provider()
+                if onnx_provider is not None:
+                    try:
+                        classifier = _load_onnx_classifier(onnx_provider)
+                    except Exception as e:
+                        print(f"ONNX face emotion model failed to load, using PyTorch: {e}")
+                if classifier is None:
+                    classifier = _load_torch_classifier()
+                width, height = CLASSIFY_INPUT_SIZE
+                classifier([np.zeros((height, width, 3), dtype=np.uint8)])
+                _image_classifier = classifier
     return _image_classifier
 
 
+def _onnx_provider() -> Optional[str]:
+    """
+    Pick the ONNX Runtime execution provider to use, or None to use PyTorch.
+
+    A CUDA GPU is only worth handing to ORT if ORT itself can use it;
+    otherwise the FP16 PyTorch model is the faster option.
+    """
+    if not ORT_AVAILABLE:
+        return None
+    import onnxruntime as ort
+
+    if "CUDAExecutionProvider" in ort.get_available_providers():
+        return "CUDAExecutionProvider"
+    if _cuda_available():
+        return None
+    return "CPUExecutionProvider"
+
+
+def _load_torch_classifier():
+    """Load the PyTorch model (FP16 on GPU) with its image processor."""
+    import torch
+    from transformers import AutoImageProcessor, AutoModelForImageClassification
+
+    if torch.cuda.is_available():
+        device, dtype = torch.device("cuda"), torch.float16
+    else:
+        device, dtype = torch.device("cpu"), torch.float32
+
+    # Load the dima806 facial emotion detection model
+    processor = AutoImageProcessor.from_pretrained(FER_MODEL_NAME)
+    model = AutoModelForImageClassification.from_pretrained(FER_MODEL_NAME, torch_dtype=dtype)
+    model = model.to(device).eval()
+    channels_last = device.type == "cuda"
+    if channels_last:
+        # NHWC lets the patch-embedding convolution use tensor-core kernels
+        model = model.to(memory_format=torch.channels_last)
+    traced = _trace_for_cpu(model) if device.type == "cpu" else None
+    return _FaceEmotionClassifier(processor, model, device, dtype, channels_last, traced)
+
+
+def _trace_for_cpu(model):
+    """
+    Trace the model's logits forward into a frozen TorchScript graph.
+
+    On CPU this removes per-op Python dispatch, and optimize_for_inference
+    folds and fuses ops (e.g. linear + activation) in the frozen graph.
+    The input is always CLASSIFY_INPUT_SIZE, so tracing loses nothing.
+    
+    Returns:
+        The optimized TorchScript module, or None if tracing failed.
+    """
+    import torch
+
+    class _Logits(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, pixel_values):
+            return self.inner(pixel_values=pixel_values).logits
+
+    width, height = CLASSIFY_INPUT_SIZE
+    example = torch.zeros(2, 3, height, width)
+    try:
+        with torch.inference_mode():
+            traced = torch.jit.trace(_Logits(model).eval(), example)
+            return torch.jit.optimize_for_inference(traced)
+    except Exception as e:
+        print(f"TorchScript tracing of the face emotion model failed, using eager mode: {e}")
+        return None
+
+
+def _load_onnx_classifier(provider: str):
+    """
+    Load the model as an ONNX Runtime session with its image processor.
+
+    The first run exports the checkpoint to ONNX and saves it under
+    FER_ONNX_MODEL_DIR; later runs load the exported graph directly.
+    """
+    import onnxruntime as ort
+    import torch
+    from optimum.onnxruntime import ORTModelForImageClassification
+    from transformers import AutoImageProcessor
+
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    if (FER_ONNX_MODEL_DIR / "model.onnx").exists():
+        model = ORTModelForImageClassification.from_pretrained(
+            FER_ONNX_MODEL_DIR, provider=provider, session_options=session_options
+        )
+        processor = AutoImageProcessor.from_pretrained(FER_ONNX_MODEL_DIR)
+    else:
+        model = ORTModelForImageClassification.from_pretrained(
+            FER_MODEL_NAME, export=True, provider=provider, session_options=session_options
+        )
+        processor = AutoImageProcessor.from_pretrained(FER_MODEL_NAME)
+
+        def save(path):
+            model.save_pretrained(path)
+            processor.save_pretrained(path)
+
+        save_model_dir(FER_ONNX_MODEL_DIR, save)
+
+    # ORT takes its input from host memory and copies it to the GPU itself
+    return _FaceEmotionClassifier(processor, model, torch.device("cpu"), torch.float32)
+
+
+class _FaceEmotionClassifier:
+    """
+    Image processor + model forward for batches of RGB face crops.
+
+    Replaces the transformers pipeline: images go to the processor as
+    ndarrays (no PIL round-trip) and the whole batch runs in one forward,
+    without the pipeline's per-item preprocessing loop.
+    """
+
+    def __init__(self, processor, model, device, dtype, channels_last: bool = False, traced=None):
+        self._processor = processor
+        self._model = model
+        self._device = device
+        self._dtype = dtype
+        self._channels_last = channels_last
+        self._traced = traced
+        self._id2label = model.config.id2label
+
+    def _logits(self, pixel_values):
+        if self._traced is not None:
+            try:
+                return self._traced(pixel_values)
+            except Exception as e:
+                print(f"Traced face emotion model failed, falling back to eager mode: {e}")
+                self._traced = None
+        return self._model(pixel_values=pixel_values).logits
+
+    def __call__(self, images: List[np.ndarray]) -> List[List[Dict]]:
+        """
+        Classify a batch of RGB images.
+        
+        Args:
+            images: RGB images as numpy arrays (H, W, 3).
+        
+        Returns:
+            For each image, the top CLASSIFY_TOP_K predictions as dicts with
+            'label' and 'score' keys, highest score first.
+        """
+        import torch
+
+        inputs = self._processor(images=images, return_tensors="pt")
+        pixel_values = inputs["pixel_values"].to(self._device, self._dtype)
+        if self._channels_last:
+            pixel_values = pixel_values.contiguous(memory_format=torch.channels_last)
+        with torch.inference_mode():
+            logits = self._logits(pixel_values)
+        probs = logits.float().softmax(-1).cpu().numpy()
+
+        results = []
+        for row in probs:
+            top = np.argsort(row)[::-1][:CLASSIFY_TOP_K]
+            results.append([
+                {"label": self._id2label[int(i)], "score": float(row[i])}
+                for i in top
+            ])
+        return results
+
+
+def preload_face_models() -> None:
+    """
+    Load the face detector and emotion classifier ahead of the first request.
+
+    Intended to run on a background thread at startup.
+    """
+    try:
+        _get_face_detector()
+        _get_image_classifier()
+    except Exception as e:
+        print(f"Facial emotion model preload failed: {str(e)}")
+
+
+def _classify_batch(images: List) -> List[List[Dict]]:
+    """Run the emotion classifier over images submitted by concurrent requests."""
+    return _get_image_classifier()(images)
+
+
+# Coalesces concurrent single-image requests into batched classifier calls
+_batching_classifier = MicroBatcher(
+    _classify_batch, CLASSIFY_BATCH_SIZE, CLASSIFY_MAX_WAIT_SECONDS, name="face-emotion-batcher"
+)
+
+
 def _detect_and_crop_face(image_array: np.ndarray) -> Optional[np.ndarray]:
     """
     Detect the largest face in the image and crop it with padding.
     
+    Detection runs on a copy downscaled to at most DETECT_MAX_SIDE pixels on
+    the long side; the face is cropped from the full-resolution original.
+    
     Args:
         image_array: RGB image as numpy array (H, W, 3).
     
@@ -100,38 +386,26 @@ def _detect_and_crop_face(image_array: np.ndarray) -> Optional[np.ndarray]:
     """
     detector = _get_face_detector()
     
-    if MTCNN_AVAILABLE:
-        # MTCNN returns list of dicts with 'box' key: [x, y, width, height]
-        faces = detector.detect_faces(image_array)
-        if not faces:
-            return None
-        
-        # Get the largest face (by bounding box area)
-        largest_face = max(faces, key=lambda f: f['box'][2] * f['box'][3])
-        x, y, w, h = largest_face['box']
-        
+    height, width = image_array.shape[:2]
+    scale = min(1.0, DETECT_MAX_SIDE / max(height, width))
+    if scale < 1.0:
+        small = cv2.resize(image_array, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
     else:
-        # Haar Cascade returns list of (x, y, w, h) tuples
-        gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
-        faces = detector.detectMultiScale(
-            gray,
-            scaleFactor=1.1,
-            minNeighbors=5,
-            minSize=(30, 30)
-        )
-        if len(faces) == 0:
-            return None
-        
-        # Get the largest face (by area)
-        largest_face = max(faces, key=lambda f: f[2] * f[3])
-        x, y, w, h = largest_face
+        small = image_array
+    
+    box = _detect_largest_face(detector, small)
+    if box is None:
+        return None
+    
+    # Map the box back to original-image coordinates
+    x, y, w, h = (int(v / scale) for v in box)
     
     # Add padding (20% on each side)
     padding = int(max(w, h) * 0.2)
     x = max(0, x - padding)
     y = max(0, y - padding)
-    w = min(image_array.shape[1] - x, w + 2 * padding)
-    h = min(image_array.shape[0] - y, h + 2 * padding)
+    w = min(width - x, w + 2 * padding)
+    h = min(height - y, h + 2 * padding)
     
     # Crop the face
     cropped_face = image_array[y:y+h, x:x+w]
@@ -139,6 +413,83 @@ def _detect_and_crop_face(image_array: np.ndarray) -> Optional[np.ndarray]:
     return cropped_face
 
 
+def _detect_largest_face(detector, image_array: np.ndarray) -> Optional[tuple]:
+    """
+    Run the active face detector and return the largest face's box.
+    
+    Args:
+        detector: Detector returned by _get_face_detector().
+        image_array: RGB image as numpy array (H, W, 3).
+    
+    Returns:
+        (x, y, width, height) of the largest face, or None if no face detected.
+    """
+    if _face_detector_kind == "facenet":
+        # facenet-pytorch returns [x1, y1, x2, y2] boxes, largest face first
+        boxes, _ = detector.detect(image_array)
+        if boxes is None or len(boxes) == 0:
+            return None
+        
+        x1, y1, x2, y2 = boxes[0]
+        return x1, y1, x2 - x1, y2 - y1
+        
+    if _face_detector_kind == "mtcnn":
+        # Cheap gate: if a lenient Haar pass finds no face candidate at all,
+        # skip the three-stage CPU MTCNN cascade
+        if HAAR_PREFILTER:
+            gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
+            candidates = _get_haar_cascade().detectMultiScale(
+                gray, scaleFactor=1.3, minNeighbors=3, minSize=(30, 30)
+            )
+            if len(candidates) == 0:
+                return None
+        
+        # MTCNN returns list of dicts with 'box' key: [x, y, width, height]
+        faces = detector.detect_faces(image_array)
+        if not faces:
+            return None
+        
+        # Get the largest face (by bounding box area)
+        largest_face = max(faces, key=lambda f: f['box'][2] * f['box'][3])
+        return tuple(largest_face['box'])
+        
+    # Haar Cascade returns list of (x, y, w, h) tuples
+    gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
+    faces = detector.detectMultiScale(
+        gray,
+        scaleFactor=1.1,
+        minNeighbors=5,
+        minSize=(30, 30)
+    )
+    if len(faces) == 0:
+        return None
+    
+    # Get the largest face (by area)
+    largest_face = max(faces, key=lambda f: f[2] * f[3])
+    return tuple(largest_face)
+
+
+def _decode_image_bytes(image_bytes: bytes) -> np.ndarray:
+    """
+    Decode raw image bytes into an RGB numpy array.
+    
+    Uses OpenCV's decoder (libjpeg-turbo/libpng) and falls back to PIL for
+    formats OpenCV can't read, such as GIF.
+    
+    Args:
+        image_bytes: Raw image data (JPEG, PNG, etc.).
+    
+    Returns:
+        RGB image as numpy array (H, W, 3).
+    """
+    bgr = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if bgr is not None:
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+    
+    image = Image.open(io.BytesIO(image_bytes))
+    return np.asarray(image.convert("RGB"))
+
+
 def analyze_emotion_from_image_bytes(image_bytes: bytes) -> List[Dict]:
     """
     Analyze emotions from raw image bytes (JPEG, PNG, etc.) using hybrid approach.
@@ -160,12 +511,27 @@ def analyze_emotion_from_image_bytes(image_bytes: bytes) -> List[Dict]:
     
     # Load image from bytes
     try:
-        image = Image.open(io.BytesIO(image_bytes))
-        # Convert PIL Image to numpy array (RGB)
-        image_array = np.array(image.convert("RGB"))
+        image_array = _decode_image_bytes(image_bytes)
     except Exception as e:
         raise ValueError(f"Failed to load image: {str(e)}")
     
+    return analyze_emotion_from_array(image_array)
+
+
+def analyze_emotion_from_array(image_array: np.ndarray) -> List[Dict]:
+    """
+    Analyze emotions from an already decoded RGB image (e.g. a video frame).
+    
+    Args:
+        image_array: RGB image as numpy array (H, W, 3).
+    
+    Returns:
+        List of dicts with 'emotion' and 'score' keys, sorted by score (highest first).
+        Returns empty list if no face is detected.
+    """
+    if cv2 is None:
+        raise ImportError("OpenCV (cv2) is required. Install with: pip install opencv-python")
+    
     # Step 1: Detect and crop face
     try:
         cropped_face = _detect_and_crop_face(image_array)
@@ -176,13 +542,11 @@ def analyze_emotion_from_image_bytes(image_bytes: bytes) -> List[Dict]:
     
     # Step 2: Classify emotions on cropped face
     try:
-        classifier = _get_image_classifier()
-        
-        # Convert cropped face back to PIL Image for the classifier
-        face_image = Image.fromarray(cropped_face)
+        # Resize to the classifier's input size before handing it over
+        face_image = cv2.resize(cropped_face, CLASSIFY_INPUT_SIZE, interpolation=cv2.INTER_AREA)
         
-        # Get emotion predictions
-        predictions = classifier(face_image)
+        # Get emotion predictions (batched with any concurrent requests)
+        predictions = _batching_classifier.submit(face_image)
         
         # Convert to list of dicts with 'emotion' and 'score' keys
         emotion_list = [
@@ -199,68 +563,120 @@ def analyze_emotion_from_image_bytes(image_bytes: bytes) -> List[Dict]:
         raise ValueError(f"Failed to analyze emotions: {str(e)}")
 
 
-def extract_frame_from_video(video_bytes: bytes) -> bytes:
+def extract_frame_from_video(video_bytes: bytes) -> np.ndarray:
     """
     Extract a single frame from video bytes for emotion analysis.
     Uses the middle frame of the video.
 
+    The video is decoded in memory with PyAV when it is installed; OpenCV
+    (which can only read from a file) is used as a fallback.
+
     Args:
         video_bytes: Raw video data.
 
     Returns:
-        Image bytes (JPEG) of the extracted frame.
+        RGB frame as numpy array (H, W, 3), ready for analyze_emotion_from_array.
     """
     if cv2 is None:
         raise ImportError("OpenCV (cv2) is required for video processing. Install with: pip install opencv-python")
     
     try:
-        # Write video bytes to temporary file
-        tmp_dir = tempfile.gettempdir()
-        tmp_video_path = Path(tmp_dir) / "echomind_video_tmp.mp4"
-        
-        with open(tmp_video_path, "wb") as f:
-            f.write(video_bytes)
-        
-        try:
-            # Read video
-            cap = cv2.VideoCapture(str(tmp_video_path))
-            
-            if not cap.isOpened():
-                raise ValueError("Could not open video file")
-            
-            # Get total frames
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            
-            if total_frames == 0:
-                raise ValueError("Video has no frames")
-            
-            # Extract middle frame
-            middle_frame = total_frames // 2
-            cap.set(cv2.CAP_PROP_POS_FRAMES, middle_frame)
-            
-            ret, frame = cap.read()
-            cap.release()
-            
-            if not ret:
-                raise ValueError("Could not read frame from video")
-            
-            # Convert BGR to RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Convert to PIL Image and then to JPEG bytes
-            image = Image.fromarray(frame_rgb)
-            img_bytes = io.BytesIO()
-            image.save(img_bytes, format="JPEG")
-            img_bytes.seek(0)
-            
-            return img_bytes.read()
-            
-        finally:
-            # Cleanup
+        if av is not None:
             try:
-                tmp_video_path.unlink()
-            except OSError:
-                pass
+                return _extract_middle_frame_pyav(video_bytes)
+            except Exception as e:
+                print(f"PyAV could not decode video, falling back to OpenCV: {e}")
+        return _extract_middle_frame_cv2(video_bytes)
                 
     except Exception as e:
         raise ValueError(f"Failed to extract frame from video: {str(e)}")
+
+
+def _extract_middle_frame_pyav(video_bytes: bytes) -> np.ndarray:
+    """
+    Decode the frame at the keyframe nearest the middle of a video from an
+    in-memory buffer with PyAV.
+    
+    Args:
+        video_bytes: Raw video data.
+    
+    Returns:
+        RGB frame as numpy array (H, W, 3).
+    """
+    with av.open(io.BytesIO(video_bytes)) as container:
+        if not container.streams.video:
+            raise ValueError("Video has no video stream")
+        stream = container.streams.video[0]
+        
+        # Middle of the video in seconds; container duration is in AV_TIME_BASE units
+        if stream.duration is not None and stream.time_base is not None:
+            target = float(stream.duration * stream.time_base) / 2
+        elif container.duration is not None:
+            target = container.duration / av.time_base / 2
+        else:
+            target = 0.0
+        
+        # Seek to the keyframe at or before the target and take the first
+        # frame decoded from there. The nearest keyframe is as good as the
+        # exact middle for FER, and avoids decoding (possibly hundreds of)
+        # frames only to throw them away.
+        if target > 0:
+            container.seek(int(target / stream.time_base), stream=stream, any_frame=False)
+        
+        frame = next(container.decode(stream), None)
+        if frame is None:
+            raise ValueError("Could not read frame from video")
+        
+        return frame.to_ndarray(format="rgb24")
+
+
+def _extract_middle_frame_cv2(video_bytes: bytes) -> np.ndarray:
+    """
+    Decode the middle frame of a video with OpenCV via a temporary file.
+    
+    Args:
+        video_bytes: Raw video data.
+    
+    Returns:
+        RGB frame as numpy array (H, W, 3).
+    """
+    # Write video bytes to a uniquely named temporary file, so concurrent
+    # requests can't overwrite each other's upload
+    fd, tmp_name = tempfile.mkstemp(prefix="echomind_video_", suffix=".mp4")
+    tmp_video_path = Path(tmp_name)
+    
+    with os.fdopen(fd, "wb") as f:
+        f.write(video_bytes)
+    
+    try:
+        # Read video
+        cap = cv2.VideoCapture(str(tmp_video_path))
+        
+        if not cap.isOpened():
+            raise ValueError("Could not open video file")
+        
+        # Get total frames
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        
+        if total_frames == 0:
+            raise ValueError("Video has no frames")
+        
+        # Extract middle frame
+        middle_frame = total_frames // 2
+        cap.set(cv2.CAP_PROP_POS_FRAMES, middle_frame)
+        
+        ret, frame = cap.read()
+        cap.release()
+        
+        if not ret:
+            raise ValueError("Could not read frame from video")
+        
+        # Convert BGR to RGB
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        
+    finally:
+        # Cleanup
+        try:
+            tmp_video_path.unlink()
+        except OSError:
+            pass
@@ -1,29 +1,179 @@
 # Step1: Setup FastAPI backend
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import FastAPI, Depends, HTTPException, Request, UploadFile, File, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError, computed_field
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import func, select, update, bindparam, and_, or_, case
 from datetime import datetime, timedelta
 from typing import List, Optional
 import uvicorn
+import anyio
+import asyncio
 import io
 import wave
-import json
+import struct
+import orjson
+import calendar
 import csv
-from fastapi.responses import StreamingResponse, Response
+import gzip
+import threading
+import time
+import hashlib
+import logging
+import traceback
+from collections import OrderedDict
+from functools import lru_cache, partial
+from fastapi.responses import ORJSONResponse, StreamingResponse, Response
 
 from ai_agent import graph, SYSTEM_PROMPT, parse_response
-from database import init_db, get_db, ChatConversation
-from audio_emotion import analyze_emotion_from_wav_bytes
-from facial_emotion import analyze_emotion_from_image_bytes, extract_frame_from_video
-from sentiment_analysis import analyze_sentiment, calculate_conversation_length
-
-app = FastAPI()
+from database import (
+    SessionLocal,
+    init_db,
+    get_db,
+    insert_conversation_async,
+    insert_conversations_async,
+    AsyncSessionLocal,
+    count_conversations,
+    invalidate_conversation_count,
+    ChatConversation,
+    SENTIMENT_ASC_NULLS_LAST,
+    LENGTH_ASC_NULLS_LAST,
+    LENGTH_NULL_SORT_VALUE,
+    SENTIMENT_NULL_SORT_VALUE,
+)
+from audio_emotion import analyze_emotion_from_wav_bytes, preload_audio_classifier
+from facial_emotion import (
+    analyze_emotion_from_array,
+    analyze_emotion_from_image_bytes,
+    extract_frame_from_video,
+    preload_face_models,
+)
+from sentiment_analysis import (
+    analyze_sentiment,
+    analyze_sentiments,
+    calculate_conversation_length,
+    preload_sentiment_analyzer,
+)
+from summarizer import (
+    LOCAL_SUMMARY_MAX_CHATS,
+    emotion_template_summary,
+    estimate_tokens,
+    template_summary,
+    select_salient_chats,
+)
+
+app = FastAPI(default_response_class=ORJSONResponse)
+
+logger = logging.getLogger(__name__)
+
+# Worker threads for sync endpoints and run_in_threadpool calls
+THREADPOOL_SIZE = 100
+
+# New conversation rows are queued and written in batches, one commit (and
+# fsync) per batch. Set PERSIST_BATCHED = False to commit every row before
+# the request returns.
+PERSIST_BATCHED = True
+PERSIST_BATCH_SIZE = 32
+PERSIST_FLUSH_SECONDS = 0.05
+
+_persist_queue: Optional[asyncio.Queue] = None
+_persist_task: Optional[asyncio.Task] = None
 
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    # DB-bound endpoints are plain `def` and run in AnyIO's worker threads;
+    # raise the default limit of 40 so they don't queue behind each other.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # Load the emotion models and VADER in the background so the server starts
+    # accepting requests immediately but the first analyses are warm.
+    threading.Thread(target=preload_audio_classifier, daemon=True).start()
+    threading.Thread(target=preload_face_models, daemon=True).start()
+    threading.Thread(target=preload_sentiment_analyzer, daemon=True).start()
+    global _persist_queue, _persist_task
+    if PERSIST_BATCHED:
+        _persist_queue = asyncio.Queue()
+        _persist_task = asyncio.create_task(_persist_writer(_persist_queue))
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Flush whatever is still queued before the process exits
+    if _persist_task is not None:
+        _persist_queue.put_nowait(None)
+        await _persist_task
+
+
+async def _persist_writer(queue: asyncio.Queue) -> None:
+    """
+    Drain queued conversation rows into the database in batches.
+
+    Waits for a row, then collects more for up to PERSIST_FLUSH_SECONDS or
+    until PERSIST_BATCH_SIZE rows are queued, and inserts them with a single
+    commit. A None on the queue flushes and stops the writer.
+    """
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        row = await queue.get()
+        if row is None:
+            break
+        batch = [row]
+        deadline = loop.time() + PERSIST_FLUSH_SECONDS
+        while len(batch) < PERSIST_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                row = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if row is None:
+                stopping = True
+                break
+            batch.append(row)
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await insert_conversations_async(db, batch)
+        except Exception:
+            logger.exception("Failed to save a batch of %d conversations, retrying one by one", len(batch))
+            await _persist_rows_individually(batch)
+
+
+async def _persist_rows_individually(rows: List[dict]) -> None:
+    """
+    Insert rows one per commit after a batch insert failed, so a single bad
+    row only loses itself rather than everything queued with it.
+    """
+    async with AsyncSessionLocal() as db:
+        for row in rows:
+            try:
+                await insert_conversations_async(db, [row])
+            except Exception:
+                await db.rollback()
+                logger.exception("Failed to save conversation")
+
+
+async def _save_conversation(**row) -> None:
+    """
+    Store one conversation row, through the batch writer when it is running.
+
+    Takes ChatConversation column values as keyword arguments. The row is
+    timestamped now, not when its batch is flushed.
+    """
+    if _persist_queue is not None:
+        row["timestamp"] = datetime.utcnow()
+        _persist_queue.put_nowait(row)
+        return
+    async with AsyncSessionLocal() as db:
+        await insert_conversation_async(db, **row)
+
+@lru_cache(maxsize=1024)
+def _parse_ts(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp, accepting a trailing 'Z' for UTC."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
 
 # Step2: Receive and validate request from Frontend
 class Query(BaseModel):
@@ -42,39 +192,259 @@ class ChatResponse(BaseModel):
     class Config:
         from_attributes = True
 
+    # Preformatted so the History page doesn't parse/format every timestamp
+    # on each rerun
+    @computed_field
+    @property
+    def timestamp_display(self) -> str:
+        return self.timestamp.strftime("%B %d, %Y at %I:%M %p")
+
+    @computed_field
+    @property
+    def timestamp_epoch(self) -> int:
+        # Stored timestamps are naive UTC
+        return calendar.timegm(self.timestamp.utctimetuple())
+
+def _run_agent(inputs: dict) -> tuple:
+    """
+    Run the agent graph to completion and return (tool_called_name, response).
+
+    This blocks for the whole LLM round-trip, so async handlers call it via
+    run_in_threadpool to keep the event loop free for other requests.
+    """
+    stream = graph.stream(inputs, stream_mode="updates")
+    return parse_response(stream)
+
+
+# Cache of agent replies: /ask is keyed on the system prompt and the
+# normalized message (so retries hit), /summarize on its prompt, and the
+# emotion endpoints on their rounded emotion distribution.
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_TTL_SECONDS = 3600
+_response_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+# Replies that triggered these tools are never served from cache, since the
+# tool call itself (placing an emergency call) must happen every time.
+UNCACHEABLE_TOOLS = {"emergency_call_tool"}
+
+
+def _response_cache_key(message: str) -> bytes:
+    normalized = " ".join(message.split()).lower()
+    return hashlib.sha256((SYSTEM_PROMPT + "\x00" + normalized).encode("utf-8")).digest()
+
+
+def _response_cache_get(key: bytes) -> Optional[tuple]:
+    with _response_cache_lock:
+        entry = _response_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del _response_cache[key]
+            return None
+        _response_cache.move_to_end(key)
+        return value
+
+
+def _response_cache_put(key: bytes, value: tuple) -> None:
+    with _response_cache_lock:
+        _response_cache[key] = (time.monotonic() + RESPONSE_CACHE_TTL_SECONDS, value)
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > RESPONSE_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
+
+def _emotion_cache_key(kind: str, preds: List[dict], label_key: str) -> bytes:
+    """
+    Cache key for an emotion endpoint's LLM summary.
+
+    Scores are rounded to one decimal, so near-identical emotion
+    distributions (the common case) share one summary.
+    """
+    scores = ",".join(
+        f"{p[label_key]}:{round(float(p['score']), 1)}"
+        for p in sorted(preds, key=lambda p: p[label_key])
+    )
+    primary = preds[0][label_key] if preds else "unknown"
+    return hashlib.sha256(f"{kind}\x00{primary}\x00{scores}".encode("utf-8")).digest()
+
+
+async def _run_agent_cached(cache_key: bytes, inputs: dict) -> tuple:
+    """
+    Run the agent via the threadpool, reusing a cached reply for cache_key.
+
+    Empty replies and replies that called an UNCACHEABLE_TOOLS tool are not
+    stored.
+    """
+    cached = _response_cache_get(cache_key)
+    if cached is not None:
+        return cached
+    tool_called_name, response = await run_in_threadpool(_run_agent, inputs)
+    if response and tool_called_name not in UNCACHEABLE_TOOLS:
+        _response_cache_put(cache_key, (tool_called_name, response))
+    return tool_called_name, response
+
+
 @app.post("/ask")
-async def ask(query: Query, db: Session = Depends(get_db)):
+async def ask(query: Query):
     inputs = {"messages": [("system", SYSTEM_PROMPT), ("user", query.message)]}
     #inputs = {"messages": [("user", query.message)]}
-    stream = graph.stream(inputs, stream_mode="updates")
-    tool_called_name, final_response = parse_response(stream)
+    # Sentiment only needs the user's message, so score it while the agent runs
+    sentiment_task = asyncio.create_task(run_in_threadpool(analyze_sentiment, query.message))
+    tool_called_name, final_response = await _run_agent_cached(
+        _response_cache_key(query.message), inputs
+    )
 
     # Calculate sentiment and length
-    user_sentiment = analyze_sentiment(query.message)
+    user_sentiment = await sentiment_task
     conversation_len = calculate_conversation_length(query.message, final_response or "")
     
     # Save conversation to database
-    chat_record = ChatConversation(
+    await _save_conversation(
         user_message=query.message,
         assistant_response=final_response or "",
         tool_called=tool_called_name if tool_called_name != "None" else None,
-        timestamp=datetime.utcnow(),
         sentiment_score=user_sentiment.get("compound", 0.0),
         conversation_length=conversation_len
     )
-    db.add(chat_record)
-    db.commit()
-    db.refresh(chat_record)
 
     # Step3: Send response to the frontend
     return {"response": final_response,
             "tool_called": tool_called_name}
 
 
+@app.post("/ask/stream")
+def ask_stream(query: Query):
+    """
+    Like /ask, but streams the agent's reply as it is generated.
+
+    The body is newline-delimited JSON: zero or more {"delta": "..."} lines
+    with reply text, {"tool_called": "..."} when the agent calls a tool
+    (text streamed before a tool call is discarded by the final reply), and
+    a final {"done": true, "response": "...", "tool_called": "..."} line.
+    If the agent fails mid-stream, the last line is {"error": "..."} instead.
+    The conversation is stored after the final line is sent.
+    """
+    def _line(payload: dict) -> bytes:
+        return orjson.dumps(payload) + b"\n"
+
+    def generate():
+        cache_key = _response_cache_key(query.message)
+        cached = _response_cache_get(cache_key)
+        if cached is not None:
+            tool_called_name, final_response = cached
+            yield _line({"delta": final_response})
+        else:
+            inputs = {"messages": [("system", SYSTEM_PROMPT), ("user", query.message)]}
+            tool_called_name = "None"
+            parts = []
+            try:
+                for chunk, metadata in graph.stream(inputs, stream_mode="messages"):
+                    node = metadata.get("langgraph_node")
+                    if node == "tools":
+                        tool_called_name = getattr(chunk, "name", None) or "None"
+                        # The agent's reply comes after the tool result
+                        parts = []
+                        yield _line({"tool_called": tool_called_name})
+                    elif node == "agent" and isinstance(chunk.content, str) and chunk.content:
+                        parts.append(chunk.content)
+                        yield _line({"delta": chunk.content})
+            except Exception as e:
+                # The 200 status is already sent, so report the failure in-band
+                logger.exception("Agent failed while streaming a reply")
+                yield _line({"error": str(e)})
+                return
+            final_response = "".join(parts) or None
+            if final_response and tool_called_name not in UNCACHEABLE_TOOLS:
+                _response_cache_put(cache_key, (tool_called_name, final_response))
+
+        yield _line({"done": True, "response": final_response, "tool_called": tool_called_name})
+
+        user_sentiment = analyze_sentiment(query.message)
+        conversation_len = calculate_conversation_length(query.message, final_response or "")
+        try:
+            # Starlette iterates this generator on a worker thread; hand the
+            # row to the event loop so it goes through the same writer as /ask
+            anyio.from_thread.run(partial(
+                _save_conversation,
+                user_message=query.message,
+                assistant_response=final_response or "",
+                tool_called=tool_called_name if tool_called_name != "None" else None,
+                sentiment_score=user_sentiment.get("compound", 0.0),
+                conversation_length=conversation_len
+            ))
+        except Exception:
+            logger.exception("Failed to save streamed conversation")
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+def _apply_cursor(query, cursor_ts: Optional[str], cursor_id: Optional[int], descending: bool):
+    """
+    Restrict a timestamp-ordered query to rows after a (timestamp, id) cursor.
+
+    Keyset pagination: the next page starts right after the last row the
+    client saw, so the database seeks via the timestamp index instead of
+    scanning and discarding OFFSET rows. Without a cursor_id the cursor is
+    timestamp-only: rows sharing the cursor's exact timestamp are skipped.
+    """
+    if not cursor_ts:
+        return query
+    try:
+        ts = _parse_ts(cursor_ts)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor_ts.")
+    if cursor_id is None:
+        if descending:
+            return query.filter(ChatConversation.timestamp < ts)
+        return query.filter(ChatConversation.timestamp > ts)
+    if descending:
+        return query.filter(or_(
+            ChatConversation.timestamp < ts,
+            and_(ChatConversation.timestamp == ts, ChatConversation.id < cursor_id),
+        ))
+    return query.filter(or_(
+        ChatConversation.timestamp > ts,
+        and_(ChatConversation.timestamp == ts, ChatConversation.id > cursor_id),
+    ))
+
+
+def _apply_value_cursor(query, sort_key, cursor_value: Optional[float], cursor_id: Optional[int],
+                        descending: bool, null_value: Optional[int] = None):
+    """
+    Restrict a value-ordered query to rows after a (value, id) cursor.
+
+    The keyset counterpart of _apply_cursor for the length/sentiment sorts,
+    which order by (sort_key, id). Descending sorts use the bare column, where
+    SQLite puts NULLs last; a missing cursor_value then means the previous
+    page ended inside the NULL tail. Ascending sorts use a coalesce()
+    expression, so a NULL cursor_value stands for null_value.
+    """
+    if cursor_id is None:
+        return query
+    if descending:
+        if cursor_value is None:
+            return query.filter(sort_key.is_(None), ChatConversation.id < cursor_id)
+        return query.filter(or_(
+            sort_key < cursor_value,
+            and_(sort_key == cursor_value, ChatConversation.id < cursor_id),
+            sort_key.is_(None),
+        ))
+    value = null_value if cursor_value is None else cursor_value
+    return query.filter(or_(
+        sort_key > value,
+        and_(sort_key == value, ChatConversation.id > cursor_id),
+    ))
+
+
 @app.get("/chats", response_model=List[ChatResponse])
-async def get_chats(
+def get_chats(
     skip: int = 0,
     limit: int = 100,
+    cursor_ts: Optional[str] = None,
+    cursor_id: Optional[int] = None,
+    before: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
@@ -82,128 +452,254 @@ async def get_chats(
     Useful for sentiment analysis and historical data review.
     
     Args:
-        skip: Number of records to skip (for pagination)
+        skip: Number of records to skip (deprecated; prefer the keyset cursor)
         limit: Maximum number of records to return
+        cursor_ts: Timestamp of the last row of the previous page (keyset pagination)
+        cursor_id: ID of the last row of the previous page (keyset pagination)
+        before: Only return chats strictly older than this ISO timestamp
+            (shorthand for a timestamp-only cursor)
     
     Returns:
         List of chat conversations with timestamps
     """
-    chats = db.query(ChatConversation).order_by(ChatConversation.timestamp.desc()).offset(skip).limit(limit).all()
+    if before and not cursor_ts:
+        cursor_ts, cursor_id = before, None
+
+    query = select(ChatConversation.__table__).order_by(
+        ChatConversation.timestamp.desc(), ChatConversation.id.desc()
+    )
+    query = _apply_cursor(query, cursor_ts, cursor_id, descending=True)
+
+    # Plain rows (not ORM instances): the response is read-only, so there is
+    # no point paying for identity-map bookkeeping on every row.
+    chats = db.execute(query.offset(skip).limit(limit)).all()
     return chats
 
 
 @app.get("/chats/count")
-async def get_chat_count(db: Session = Depends(get_db)):
+def get_chat_count(db: Session = Depends(get_db)):
     """
     Get the total count of stored chat conversations.
     """
-    count = db.query(ChatConversation).count()
+    count = count_conversations(db)
     return {"total_chats": count}
 
 
+# Number of conversations (picked by TF-IDF salience) sent to the LLM.
+SUMMARY_MAX_CHATS = 10
+# Approximate token budget for the conversations block of the prompt.
+SUMMARY_TOKEN_BUDGET = 2000
+
+SUMMARY_SYSTEM_PROMPT = """You are a mental health analyst. Provide comprehensive, to-the-point, precise (Maximum 100 words), empathetic summaries of mental health conversations.
+Analyze the patterns, key themes, emotional states, concerns raised, and overall progress.
+Provide insights in a structured format covering:
+1. Overall emotional journey and patterns
+2. Main concerns and topics discussed
+3. Tools or resources utilized
+4. Progress indicators (if any)
+5. Key insights and recommendations
+
+Please provide a detailed, empathetic summary that helps understand the user's mental health journey."""
+
+
+def _format_summary_chat(chat: dict) -> str:
+    """
+    Format one chat dict for the /summarize prompt (without its number).
+    """
+    # Extract data from dict
+    timestamp = chat.get("timestamp")
+    user_msg = chat.get("user_message", "")
+    assistant_msg = chat.get("assistant_response", "")
+    tool_called = chat.get("tool_called")
+    
+    # Format timestamp
+    try:
+        if timestamp:
+            if isinstance(timestamp, str):
+                # Handle ISO format strings
+                timestamp = _parse_ts(timestamp)
+            formatted_time = timestamp.strftime("%Y-%m-%d %H:%M")
+        else:
+            formatted_time = "Unknown time"
+    except Exception:
+        formatted_time = "Unknown time"
+    
+    lines = [f"({formatted_time}):", f"User: {user_msg}", f"Assistant: {assistant_msg}"]
+    if tool_called:
+        lines.append(f"Tool Used: {tool_called}")
+    return "\n".join(lines) + "\n"
+
+
 class SummaryRequest(BaseModel):
     chats: List[dict]  # Accept dicts directly from frontend
 
 
+async def _read_summary_request(request: Request) -> SummaryRequest:
+    """
+    Parse a /summarize body sent either as JSON ({"chats": [...]}) or as
+    NDJSON with one chat per line, optionally gzip-compressed.
+    """
+    body = await request.body()
+    if request.headers.get("content-encoding", "").lower() == "gzip":
+        try:
+            body = gzip.decompress(body)
+        except OSError:
+            raise HTTPException(status_code=400, detail="Invalid gzip body.")
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            return SummaryRequest(chats=[orjson.loads(line) for line in body.splitlines() if line.strip()])
+        return SummaryRequest.model_validate_json(body)
+    except (orjson.JSONDecodeError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid summarize request: {e}")
+
+
 @app.post("/summarize")
-async def summarize_chats(request: SummaryRequest):
+async def summarize_chats(request: SummaryRequest = Depends(_read_summary_request)):
     """
     Generate a comprehensive summary of all chat conversations.
+
+    The chats may be posted as JSON or as (gzipped) NDJSON.
     """
     try:
         if not request.chats or len(request.chats) == 0:
             return {"summary": "No conversations available to summarize."}
         
-        # Prepare conversation history for summarization
-        conversation_text = "Here are all the past conversations:\n\n"
-        # Process chats in reverse order (most recent first) and limit to 20
+        # A couple of conversations don't need an LLM round-trip
+        if len(request.chats) <= LOCAL_SUMMARY_MAX_CHATS:
+            return {"summary": template_summary(request.chats)}
+        
+        # Process chats in reverse order (most recent first) and limit to 20,
+        # then keep only the most informative ones to cut prompt tokens
         chats_to_process = request.chats[:20] if len(request.chats) > 20 else request.chats
+        chats_to_process = select_salient_chats(chats_to_process, SUMMARY_MAX_CHATS)
+        # Newest first by id, whatever order the client sent them in
+        chats_to_process = sorted(chats_to_process, key=lambda c: c.get("id") or 0, reverse=True)
         
+        # Fill the token budget newest-first with whole conversations, so
+        # the oldest ones are dropped rather than cutting a turn in half
+        blocks = []
+        used_tokens = 0
         for idx, chat in enumerate(chats_to_process, 1):
             try:
-                # Extract data from dict
-                timestamp = chat.get("timestamp")
-                user_msg = chat.get("user_message", "")
-                assistant_msg = chat.get("assistant_response", "")
-                tool_called = chat.get("tool_called")
-                
-                # Format timestamp
-                try:
-                    if timestamp:
-                        if isinstance(timestamp, str):
-                            # Handle ISO format strings
-                            timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-                        formatted_time = timestamp.strftime("%Y-%m-%d %H:%M")
-                    else:
-                        formatted_time = "Unknown time"
-                except Exception:
-                    formatted_time = "Unknown time"
-                
-                conversation_text += f"Conversation {idx} ({formatted_time}):\n"
-                conversation_text += f"User: {user_msg}\n"
-                conversation_text += f"Assistant: {assistant_msg}\n"
-                if tool_called:
-                    conversation_text += f"Tool Used: {tool_called}\n"
-                conversation_text += "\n---\n\n"
-                    
+                block = _format_summary_chat(chat)
             except Exception as e:
                 # Skip problematic chats and continue
                 print(f"Skipping chat {idx} due to error: {str(e)}")
                 continue
+            
+            block_tokens = estimate_tokens(block)
+            if blocks and used_tokens + block_tokens > SUMMARY_TOKEN_BUDGET:
+                break
+            blocks.append(block)
+            used_tokens += block_tokens
         
-        # Truncate if too long (roughly 8000 characters to leave room for prompt)
-        if len(conversation_text) > 8000:
-            conversation_text = conversation_text[:8000] + "\n\n[... truncated for length ...]"
+        # Prepare conversation history for summarization, oldest first
+        blocks.reverse()
+        conversation_text = "".join(
+            f"Conversation {idx} {block}\n" for idx, block in enumerate(blocks, 1)
+        )
         
-        # Create a summarization prompt
-        summary_prompt = f"""Please provide a comprehensive, to-the-point and precise (Maximum 100 words) summary of the following mental health conversations. 
-Analyze the patterns, key themes, emotional states, concerns raised, and overall progress. 
-Provide insights in a structured format covering:
-1. Overall emotional journey and patterns
-2. Main concerns and topics discussed
-3. Tools or resources utilized
-4. Progress indicators (if any)
-5. Key insights and recommendations
-
-Conversations:
-{conversation_text}
-
-Please provide a detailed, empathetic summary that helps understand the user's mental health journey."""
+        # Static instructions live in the system message so the prompt
+        # prefix is identical across calls; only the conversations vary
+        summary_prompt = f"Conversations:\n{conversation_text}"
         
         # Use the AI agent to generate summary
         try:
-            inputs = {"messages": [("system", "You are a mental health analyst. Provide comprehensive, to-the-point, precise (Maximum 100 words), empathetic summaries of mental health conversations."), ("user", summary_prompt)]}
-            stream = graph.stream(inputs, stream_mode="updates")
-            tool_called_name, summary_response = parse_response(stream)
+            inputs = {"messages": [("system", SUMMARY_SYSTEM_PROMPT), ("user", summary_prompt)]}
+            # Identical chat selections produce an identical prompt
+            cache_key = hashlib.sha256(("summarize\x00" + summary_prompt).encode("utf-8")).digest()
+            tool_called_name, summary_response = await _run_agent_cached(cache_key, inputs)
             
             if summary_response:
                 return {"summary": summary_response}
             else:
                 return {"summary": "Unable to generate summary at this time. Please try again."}
         except Exception as e:
-            import traceback
             error_details = traceback.format_exc()
             print(f"Error in AI summary generation: {error_details}")
             # Return 200 with error message instead of raising exception
             return {"summary": f"Error generating summary: {str(e)}. Please check the backend logs for details."}
             
     except Exception as e:
-        import traceback
         error_details = traceback.format_exc()
         print(f"Error in summarize endpoint: {error_details}")
         # Return 200 with error message instead of raising exception
         return {"summary": f"Error processing request: {str(e)}. Please check the backend logs for details."}
 
 
+def _wav_duration_seconds(audio_bytes: bytes) -> float:
+    """
+    Return the duration of a WAV file by reading only its chunk headers.
+
+    Walks the RIFF chunks for `fmt ` (byte rate) and `data` (payload size)
+    with struct, without copying the buffer. Falls back to the `wave`
+    module for anything the walk can't make sense of; raises if neither
+    can read the file.
+    """
+    if audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE":
+        byte_rate = None
+        offset = 12
+        while offset + 8 <= len(audio_bytes):
+            chunk_id, chunk_size = struct.unpack_from("<4sI", audio_bytes, offset)
+            body = offset + 8
+            if chunk_id == b"fmt " and chunk_size >= 16:
+                byte_rate = struct.unpack_from("<I", audio_bytes, body + 8)[0]
+            elif chunk_id == b"data":
+                if not byte_rate:
+                    break
+                # Streamed recordings may leave the size unset (0 or 0xFFFFFFFF)
+                data_size = min(chunk_size, len(audio_bytes) - body) or len(audio_bytes) - body
+                return data_size / float(byte_rate)
+            # Chunks are padded to an even number of bytes
+            offset = body + chunk_size + (chunk_size & 1)
+
+    with wave.open(io.BytesIO(audio_bytes), "rb") as wf:
+        n_frames = wf.getnframes()
+        framerate = wf.getframerate()
+        return n_frames / float(framerate) if framerate else 0.0
+
+
+async def _persist_analysis(
+    user_message: str,
+    record_text: str,
+    tool_called: str,
+    llm_summary: str,
+    emotion_data: Optional[dict],
+) -> None:
+    """
+    Store a voice/face analysis as a conversation row.
+
+    Runs as a background task once the response has gone out; failures are
+    logged rather than raised.
+    """
+    try:
+        # Calculate sentiment from the summary
+        sentiment = await run_in_threadpool(analyze_sentiment, llm_summary)
+        conversation_len = calculate_conversation_length(user_message, record_text)
+        
+        await _save_conversation(
+            user_message=user_message,
+            assistant_response=record_text,
+            tool_called=tool_called,
+            sentiment_score=sentiment.get("compound", 0.0),
+            conversation_length=conversation_len,
+            emotion_data=emotion_data
+        )
+    except Exception as e:
+        print(f"Failed to save {tool_called} analysis: {e}")
+
+
 @app.post("/analyze_audio")
 async def analyze_audio(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    detailed: bool = False,
 ):
     """
     Analyze emotions from a recorded audio clip using a pretrained SER model.
 
-    Expects a WAV file upload from the frontend.
+    Expects a WAV file upload from the frontend. The supportive summary comes
+    from a template unless `detailed=true` asks for an LLM-written one.
     """
     try:
         if file.content_type not in ("audio/wav", "audio/x-wav", "audio/wave"):
@@ -213,15 +709,12 @@ async def analyze_audio(
 
         # Basic validation: ensure it's a readable WAV
         try:
-            with wave.open(io.BytesIO(audio_bytes), "rb") as wf:
-                n_frames = wf.getnframes()
-                framerate = wf.getframerate()
-                duration_sec = n_frames / float(framerate) if framerate else 0.0
+            duration_sec = _wav_duration_seconds(audio_bytes)
         except Exception:
             raise HTTPException(status_code=400, detail="Invalid WAV file.")
 
         # Run emotion classifier. top_k=None -> return all emotion labels from the model.
-        preds = analyze_emotion_from_wav_bytes(audio_bytes, top_k=None)
+        preds = await run_in_threadpool(analyze_emotion_from_wav_bytes, audio_bytes, top_k=None)
 
         # Build a human-readable summary from raw model output
         if preds:
@@ -231,61 +724,51 @@ async def analyze_audio(
             top_labels = "No emotions detected."
             primary = "unknown"
 
-        base_analysis = (
+        analysis = (
             f"Primary detected emotion in your voice: {primary}. "
-            f"Full emotion distribution: {top_labels}."
+            f"All detected emotions and scores: {top_labels}."
         )
 
-        # Ask the LLM to generate a short, 2-line supportive summary
-        llm_prompt = (
-            "You are a compassionate mental health assistant. "
-            "Given the following acoustic emotion analysis of a user's voice, "
-            "write a friendly, empathetic TWO-LINE summary (no more than 2 sentences total). "
-            "Use plain language, no bullet points, no markdown formatting.\n\n"
-            f"Analysis details: {base_analysis}\n\n"
-            "Now respond with only the two-line summary:"
-        )
+        # A canned line covers the common emotions; the LLM is only asked
+        # for a detailed summary or an emotion without a template
+        llm_summary = None if detailed else emotion_template_summary(primary, "voice")
 
         try:
-            inputs = {"messages": [("system", SYSTEM_PROMPT), ("user", llm_prompt)]}
-            stream = graph.stream(inputs, stream_mode="updates")
-            _, llm_summary = parse_response(stream)
+            if llm_summary is None:
+                # Ask the LLM to generate a short, 2-line supportive summary
+                llm_prompt = (
+                    "You are a compassionate mental health assistant. "
+                    "Given the following acoustic emotion analysis of a user's voice, "
+                    "write a friendly, empathetic TWO-LINE summary (no more than 2 sentences total). "
+                    "Use plain language, no bullet points, no markdown formatting.\n\n"
+                    f"Analysis details: {analysis}\n\n"
+                    "Now respond with only the two-line summary:"
+                )
+                inputs = {"messages": [("system", SYSTEM_PROMPT), ("user", llm_prompt)]}
+                _, llm_summary = await _run_agent_cached(
+                    _emotion_cache_key("voice", preds, "label"), inputs
+                )
         except Exception:
             llm_summary = (
                 "I can hear that this moment carries some emotional weight for you. "
                 "Thank you for sharing your voice—it's okay to feel what you're feeling."
             )
 
-        # Persist this analysis in the same conversations table so it appears in History
-        try:
-            record_text = (
-                f"[Voice emotion analysis]\n"
-                f"Primary emotion: {primary}.\n"
-                f"All detected emotions: {top_labels}.\n"
-                f"Summary: {llm_summary}"
-            )
-            # Calculate sentiment from the summary
-            sentiment = analyze_sentiment(llm_summary)
-            conversation_len = calculate_conversation_length("[Voice note]", record_text)
-            
-            chat_record = ChatConversation(
-                user_message="[Voice note]",
-                assistant_response=record_text,
-                tool_called="speech_emotion",
-                timestamp=datetime.utcnow(),
-                sentiment_score=sentiment.get("compound", 0.0),
-                conversation_length=conversation_len,
-                emotion_data={"emotions": preds, "primary": primary} if preds else None
-            )
-            db.add(chat_record)
-            db.commit()
-        except Exception:
-            # Don't break the API if saving fails
-            db.rollback()
-
-        analysis = (
-            f"Primary detected emotion in your voice: {primary}. "
-            f"All detected emotions and scores: {top_labels}."
+        # Persist this analysis in the same conversations table so it appears
+        # in History, after the response has been sent
+        record_text = "\n".join((
+            "[Voice emotion analysis]",
+            f"Primary emotion: {primary}.",
+            f"All detected emotions: {top_labels}.",
+            f"Summary: {llm_summary}",
+        ))
+        background_tasks.add_task(
+            _persist_analysis,
+            user_message="[Voice note]",
+            record_text=record_text,
+            tool_called="speech_emotion",
+            llm_summary=llm_summary,
+            emotion_data={"emotions": preds, "primary": primary} if preds else None,
         )
 
         return {
@@ -310,14 +793,16 @@ async def analyze_audio(
 
 @app.post("/analyze_face")
 async def analyze_face(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    detailed: bool = False,
 ):
     """
     Analyze emotions from a captured photo or video frame using facial emotion recognition.
 
     Accepts image files (JPEG, PNG) or video files (MP4, AVI, etc.).
-    For videos, extracts the middle frame for analysis.
+    For videos, extracts the middle frame for analysis. The supportive summary
+    comes from a template unless `detailed=true` asks for an LLM-written one.
     """
     try:
         # Determine if it's an image or video
@@ -347,18 +832,22 @@ async def analyze_face(
         file_bytes = await file.read()
 
         # For videos, extract a frame first
+        frame = None
         if is_video:
             try:
-                file_bytes = extract_frame_from_video(file_bytes)
+                frame = await run_in_threadpool(extract_frame_from_video, file_bytes)
             except Exception as e:
                 raise HTTPException(
                     status_code=400,
                     detail=f"Failed to process video: {str(e)}"
                 )
 
-        # Analyze emotions from image
+        # Analyze emotions from the video frame or the image
         try:
-            emotion_preds = analyze_emotion_from_image_bytes(file_bytes)
+            if frame is not None:
+                emotion_preds = await run_in_threadpool(analyze_emotion_from_array, frame)
+            else:
+                emotion_preds = await run_in_threadpool(analyze_emotion_from_image_bytes, file_bytes)
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
@@ -382,61 +871,51 @@ async def analyze_face(
             f"{p['emotion']} ({p['score']:.2f})" for p in emotion_preds
         ])
 
-        base_analysis = (
+        analysis = (
             f"Primary detected emotion in your face: {primary_emotion}. "
-            f"Full emotion distribution: {emotion_labels}."
+            f"All detected emotions and scores: {emotion_labels}."
         )
 
-        # Ask the LLM to generate a short, 2-3 line supportive summary
-        llm_prompt = (
-            "You are a compassionate mental health assistant. "
-            "Given the following facial emotion analysis of a user's expression, "
-            "write a friendly, empathetic TWO-TO-THREE-LINE summary (2-3 sentences total). "
-            "Use plain language, no bullet points, no markdown formatting.\n\n"
-            f"Analysis details: {base_analysis}\n\n"
-            "Now respond with only the 2-3 line summary:"
-        )
+        # A canned line covers the common emotions; the LLM is only asked
+        # for a detailed summary or an emotion without a template
+        llm_summary = None if detailed else emotion_template_summary(primary_emotion, "expression")
 
         try:
-            inputs = {"messages": [("system", SYSTEM_PROMPT), ("user", llm_prompt)]}
-            stream = graph.stream(inputs, stream_mode="updates")
-            _, llm_summary = parse_response(stream)
+            if llm_summary is None:
+                # Ask the LLM to generate a short, 2-3 line supportive summary
+                llm_prompt = (
+                    "You are a compassionate mental health assistant. "
+                    "Given the following facial emotion analysis of a user's expression, "
+                    "write a friendly, empathetic TWO-TO-THREE-LINE summary (2-3 sentences total). "
+                    "Use plain language, no bullet points, no markdown formatting.\n\n"
+                    f"Analysis details: {analysis}\n\n"
+                    "Now respond with only the 2-3 line summary:"
+                )
+                inputs = {"messages": [("system", SYSTEM_PROMPT), ("user", llm_prompt)]}
+                _, llm_summary = await _run_agent_cached(
+                    _emotion_cache_key("face", emotion_preds, "emotion"), inputs
+                )
         except Exception:
             llm_summary = (
                 "I can see the emotions reflected in your expression. "
                 "Thank you for sharing this with me—your feelings are valid and important."
             )
 
-        # Persist this analysis in the same conversations table so it appears in History
-        try:
-            record_text = (
-                f"[Facial emotion analysis]\n"
-                f"Primary emotion: {primary_emotion}.\n"
-                f"All detected emotions: {emotion_labels}.\n"
-                f"Summary: {llm_summary}"
-            )
-            # Calculate sentiment from the summary
-            sentiment = analyze_sentiment(llm_summary)
-            conversation_len = calculate_conversation_length("[Photo/Video capture]", record_text)
-            
-            chat_record = ChatConversation(
-                user_message="[Photo/Video capture]",
-                assistant_response=record_text,
-                tool_called="facial_emotion",
-                timestamp=datetime.utcnow(),
-                sentiment_score=sentiment.get("compound", 0.0),
-                conversation_length=conversation_len,
-                emotion_data={"emotions": emotion_preds, "primary": primary_emotion} if emotion_preds else None
-            )
-            db.add(chat_record)
-            db.commit()
-        except Exception:
-            # Don't break the API if saving fails
-            db.rollback()
-
-        analysis = (
-            f"Primary detected emotion in your face: {primary_emotion}. "
-            f"All detected emotions and scores: {emotion_labels}."
+        # Persist this analysis in the same conversations table so it appears
+        # in History, after the response has been sent
+        record_text = "\n".join((
+            "[Facial emotion analysis]",
+            f"Primary emotion: {primary_emotion}.",
+            f"All detected emotions: {emotion_labels}.",
+            f"Summary: {llm_summary}",
+        ))
+        background_tasks.add_task(
+            _persist_analysis,
+            user_message="[Photo/Video capture]",
+            record_text=record_text,
+            tool_called="facial_emotion",
+            llm_summary=llm_summary,
+            emotion_data={"emotions": emotion_preds, "primary": primary_emotion} if emotion_preds else None,
         )
 
         return {
@@ -450,7 +929,6 @@ async def analyze_face(
         raise
     except Exception as e:
         # Log and return a safe message
-        import traceback
         error_details = traceback.format_exc()
         print(f"Error in analyze_face endpoint: {error_details}")
         return {
@@ -463,8 +941,39 @@ async def analyze_face(
 
 # ==================== NEW ANALYTICS & MANAGEMENT ENDPOINTS ====================
 
-@app.get("/chats/filtered")
-async def get_filtered_chats(
+@app.get("/chats/stream")
+def stream_chats(
+    limit: int = 100,
+    cursor_ts: Optional[str] = None,
+    cursor_id: Optional[int] = None,
+):
+    """
+    Stream chat conversations, newest first, as NDJSON (one chat per line).
+
+    Each line has the same fields as a /chats item. Rows are encoded and
+    sent as they are read, so neither side holds the whole page in memory.
+    Page with cursor_ts/cursor_id as for /chats.
+    """
+    query = select(ChatConversation.__table__).order_by(
+        ChatConversation.timestamp.desc(), ChatConversation.id.desc()
+    )
+    query = _apply_cursor(query, cursor_ts, cursor_id, descending=True)
+    query = query.limit(limit).execution_options(yield_per=100)
+
+    def generate():
+        # The session lives as long as the stream rather than the request
+        db = SessionLocal()
+        try:
+            for chat in db.execute(query):
+                yield ChatResponse.model_validate(chat).model_dump_json().encode("utf-8") + b"\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@app.get("/chats/filtered", response_model=List[ChatResponse])
+def get_filtered_chats(
     skip: int = 0,
     limit: int = 100,
     start_date: Optional[str] = None,
@@ -473,24 +982,32 @@ async def get_filtered_chats(
     sentiment_min: Optional[float] = None,
     sentiment_max: Optional[float] = None,
     sort_by: str = "newest",
+    cursor_ts: Optional[str] = None,
+    cursor_value: Optional[float] = None,
+    cursor_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
     """
     Get filtered and sorted chat conversations.
+
+    Page by keyset instead of skip by passing the id of the last row of the
+    previous page as cursor_id, along with its timestamp as cursor_ts for the
+    "newest" and "oldest" sorts, or its conversation_length/sentiment_score
+    as cursor_value for the others (omitted when that value is null).
     """
-    query = db.query(ChatConversation)
+    query = select(ChatConversation.__table__)
     
     # Date filter
     if start_date:
         try:
-            start_dt = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
+            start_dt = _parse_ts(start_date)
             query = query.filter(ChatConversation.timestamp >= start_dt)
         except:
             pass
     
     if end_date:
         try:
-            end_dt = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
+            end_dt = _parse_ts(end_date)
             query = query.filter(ChatConversation.timestamp <= end_dt)
         except:
             pass
@@ -509,31 +1026,79 @@ async def get_filtered_chats(
         query = query.filter(ChatConversation.sentiment_score <= sentiment_max)
     
     # Sort
-    if sort_by == "newest":
-        query = query.order_by(ChatConversation.timestamp.desc())
-    elif sort_by == "oldest":
-        query = query.order_by(ChatConversation.timestamp.asc())
+    if sort_by == "oldest":
+        query = query.order_by(ChatConversation.timestamp.asc(), ChatConversation.id.asc())
+        query = _apply_cursor(query, cursor_ts, cursor_id, descending=False)
     elif sort_by == "longest":
-        # SQLite doesn't support .nulls_last(), use coalesce() with -1 so NULLs sort last
-        query = query.order_by(func.coalesce(ChatConversation.conversation_length, -1).desc())
+        # SQLite sorts NULLs first, so DESC already puts them last and can
+        # walk the plain conversation_length index (id is its implicit tail)
+        sort_key = ChatConversation.conversation_length
+        query = query.order_by(sort_key.desc(), ChatConversation.id.desc())
+        query = _apply_value_cursor(query, sort_key, cursor_value, cursor_id, descending=True)
     elif sort_by == "shortest":
-        # SQLite doesn't support .nulls_last(), use coalesce() with large number so NULLs sort last
-        query = query.order_by(func.coalesce(ChatConversation.conversation_length, 999999999).asc())
+        # coalesce() to a large number so NULLs sort last (expression-indexed)
+        query = query.order_by(LENGTH_ASC_NULLS_LAST, ChatConversation.id.asc())
+        query = _apply_value_cursor(query, LENGTH_ASC_NULLS_LAST, cursor_value, cursor_id,
+                                    descending=False, null_value=LENGTH_NULL_SORT_VALUE)
     elif sort_by == "most_positive":
-        # SQLite doesn't support .nulls_last(), use coalesce() with -2 so NULLs sort last
-        query = query.order_by(func.coalesce(ChatConversation.sentiment_score, -2).desc())
+        # NULLs already sort last in DESC; uses the sentiment_score index
+        sort_key = ChatConversation.sentiment_score
+        query = query.order_by(sort_key.desc(), ChatConversation.id.desc())
+        query = _apply_value_cursor(query, sort_key, cursor_value, cursor_id, descending=True)
     elif sort_by == "most_negative":
-        # SQLite doesn't support .nulls_last(), use coalesce() with 2 so NULLs sort last
-        query = query.order_by(func.coalesce(ChatConversation.sentiment_score, 2).asc())
+        # coalesce() to 2 so NULLs sort last (expression-indexed)
+        query = query.order_by(SENTIMENT_ASC_NULLS_LAST, ChatConversation.id.asc())
+        query = _apply_value_cursor(query, SENTIMENT_ASC_NULLS_LAST, cursor_value, cursor_id,
+                                    descending=False, null_value=SENTIMENT_NULL_SORT_VALUE)
     else:
-        query = query.order_by(ChatConversation.timestamp.desc())
+        # "newest" (default)
+        query = query.order_by(ChatConversation.timestamp.desc(), ChatConversation.id.desc())
+        query = _apply_cursor(query, cursor_ts, cursor_id, descending=True)
     
-    chats = query.offset(skip).limit(limit).all()
+    chats = db.execute(query.offset(skip).limit(limit)).all()
     return chats
 
 
+# Analysis rows store the placeholder "[Voice note]"/"[Photo/Video capture]"
+# as the user message, so their sentiment comes from the stored analysis.
+ANALYSIS_TOOLS = ("speech_emotion", "facial_emotion")
+
+
+@app.post("/chats/backfill_sentiment")
+def backfill_sentiment(db: Session = Depends(get_db)):
+    """
+    Score every conversation stored without a sentiment_score.
+
+    Texts are scored in one batch and written back with a single
+    executemany UPDATE in one transaction.
+    """
+    rows = db.execute(
+        select(
+            ChatConversation.id,
+            ChatConversation.user_message,
+            ChatConversation.assistant_response,
+            ChatConversation.tool_called,
+        ).where(ChatConversation.sentiment_score.is_(None))
+    ).all()
+    if not rows:
+        return {"updated": 0}
+
+    texts = [
+        (row.assistant_response if row.tool_called in ANALYSIS_TOOLS else row.user_message) or ""
+        for row in rows
+    ]
+    scores = analyze_sentiments(texts)
+    table = ChatConversation.__table__
+    db.execute(
+        update(table).where(table.c.id == bindparam("row_id")).values(sentiment_score=bindparam("score")),
+        [{"row_id": row.id, "score": result.get("compound", 0.0)} for row, result in zip(rows, scores)],
+    )
+    db.commit()
+    return {"updated": len(rows)}
+
+
 @app.delete("/chats/{chat_id}")
-async def delete_chat(chat_id: int, db: Session = Depends(get_db)):
+def delete_chat(chat_id: int, db: Session = Depends(get_db)):
     """Delete a specific chat conversation."""
     chat = db.query(ChatConversation).filter(ChatConversation.id == chat_id).first()
     if not chat:
@@ -541,31 +1106,50 @@ async def delete_chat(chat_id: int, db: Session = Depends(get_db)):
     
     db.delete(chat)
     db.commit()
+    invalidate_conversation_count()
     return {"message": "Chat deleted successfully", "id": chat_id}
 
 
 @app.get("/chats/analytics/stats")
-async def get_analytics_stats(db: Session = Depends(get_db)):
+def get_analytics_stats(db: Session = Depends(get_db)):
     """Get comprehensive analytics statistics."""
     from sqlalchemy import extract
     
-    total_chats = db.query(ChatConversation).count()
-    
-    # Average conversation length
-    avg_length = db.query(func.avg(ChatConversation.conversation_length)).scalar() or 0
+    week_ago = datetime.utcnow() - timedelta(days=7)
     
-    # Sentiment statistics
-    avg_sentiment = db.query(func.avg(ChatConversation.sentiment_score)).scalar() or 0
-    positive_count = db.query(ChatConversation).filter(ChatConversation.sentiment_score > 0.05).count()
-    negative_count = db.query(ChatConversation).filter(ChatConversation.sentiment_score < -0.05).count()
+    # Totals, averages, sentiment buckets and recent activity in one pass
+    (
+        total_chats,
+        avg_length,
+        avg_sentiment,
+        positive_count,
+        negative_count,
+        recent_count,
+    ) = db.execute(select(
+        func.count(ChatConversation.id),
+        func.avg(ChatConversation.conversation_length),
+        func.avg(ChatConversation.sentiment_score),
+        func.sum(case((ChatConversation.sentiment_score > 0.05, 1), else_=0)),
+        func.sum(case((ChatConversation.sentiment_score < -0.05, 1), else_=0)),
+        func.sum(case((ChatConversation.timestamp >= week_ago, 1), else_=0)),
+    )).one()
+    avg_length = avg_length or 0
+    avg_sentiment = avg_sentiment or 0
+    positive_count = positive_count or 0
+    negative_count = negative_count or 0
+    recent_count = recent_count or 0
     neutral_count = total_chats - positive_count - negative_count
     
     # Tool usage
-    tool_counts = {}
-    tools = db.query(ChatConversation.tool_called).distinct().all()
-    for tool in tools:
-        if tool[0]:
-            tool_counts[tool[0]] = db.query(ChatConversation).filter(ChatConversation.tool_called == tool[0]).count()
+    tool_counts = {
+        tool: count
+        for tool, count in db.execute(
+            select(ChatConversation.tool_called, func.count())
+            .where(ChatConversation.tool_called.isnot(None))
+            .group_by(ChatConversation.tool_called)
+        ).all()
+        if tool
+    }
     
     # Most active day
     day_counts = db.query(
@@ -574,10 +1158,6 @@ async def get_analytics_stats(db: Session = Depends(get_db)):
     ).group_by('day').all()
     most_active_day = max(day_counts, key=lambda x: x[1])[0] if day_counts else None
     
-    # Recent activity (last 7 days)
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    recent_count = db.query(ChatConversation).filter(ChatConversation.timestamp >= week_ago).count()
-    
     return {
         "total_chats": total_chats,
         "average_length": round(avg_length, 0),
@@ -594,48 +1174,45 @@ async def get_analytics_stats(db: Session = Depends(get_db)):
 
 
 @app.get("/chats/analytics/trends")
-async def get_sentiment_trends(
+def get_sentiment_trends(
     days: int = 30,
     db: Session = Depends(get_db)
 ):
     """Get sentiment trends over time."""
     start_date = datetime.utcnow() - timedelta(days=days)
     
-    # For SQLite, use func.date() instead of cast to Date
-    # Get all chats in the date range first, then group by date in Python
-    chats = db.query(ChatConversation).filter(
-        ChatConversation.timestamp >= start_date
+    # Aggregate per calendar day in SQL; AVG skips NULL sentiment scores,
+    # COUNT includes every chat
+    day = func.date(ChatConversation.timestamp).label("day")
+    rows = db.execute(
+        select(
+            day,
+            func.avg(ChatConversation.sentiment_score),
+            func.count(ChatConversation.id),
+        )
+        .where(ChatConversation.timestamp >= start_date)
+        .group_by(day)
+        .order_by(day)
     ).all()
     
-    # Group by date and calculate averages
-    from collections import defaultdict
-    date_stats = defaultdict(lambda: {"sentiments": [], "count": 0})
-    
-    for chat in chats:
-        # Extract date part (YYYY-MM-DD)
-        date_str = chat.timestamp.date().isoformat()
-        if chat.sentiment_score is not None:
-            date_stats[date_str]["sentiments"].append(chat.sentiment_score)
-        date_stats[date_str]["count"] += 1
-    
-    # Convert to list format
-    trends = []
-    for date_str in sorted(date_stats.keys()):
-        stats = date_stats[date_str]
-        avg_sentiment = sum(stats["sentiments"]) / len(stats["sentiments"]) if stats["sentiments"] else 0.0
-        trends.append({
+    trends = [
+        {
             "date": date_str,
-            "avg_sentiment": round(float(avg_sentiment), 3),
-            "count": stats["count"]
-        })
+            "avg_sentiment": round(float(avg_sentiment or 0.0), 3),
+            "count": count,
+        }
+        for date_str, avg_sentiment, count in rows
+    ]
     
     return trends
 
 
 @app.get("/chats/analytics/emotions")
-async def get_emotion_distribution(db: Session = Depends(get_db)):
+def get_emotion_distribution(db: Session = Depends(get_db)):
     """Get emotion distribution from speech/facial emotion analyses."""
-    emotion_entries = db.query(ChatConversation).filter(
+    emotion_entries = db.query(ChatConversation).options(
+        load_only(ChatConversation.emotion_data)
+    ).filter(
         ChatConversation.emotion_data.isnot(None)
     ).all()
     
@@ -653,23 +1230,27 @@ async def get_emotion_distribution(db: Session = Depends(get_db)):
 
 
 @app.get("/chats/reports/weekly")
-async def get_weekly_report(db: Session = Depends(get_db)):
+def get_weekly_report(db: Session = Depends(get_db)):
     """Generate weekly mental health report."""
     week_ago = datetime.utcnow() - timedelta(days=7)
-    chats = db.query(ChatConversation).filter(
-        ChatConversation.timestamp >= week_ago
-    ).order_by(ChatConversation.timestamp.desc()).all()
+    # Missing sentiment scores count as 0, as they always have in the reports
+    score = func.coalesce(ChatConversation.sentiment_score, 0.0)
+    total, avg_sentiment, speech_count, facial_count = db.execute(
+        select(
+            func.count(ChatConversation.id),
+            func.avg(score),
+            func.sum(case((ChatConversation.tool_called == "speech_emotion", 1), else_=0)),
+            func.sum(case((ChatConversation.tool_called == "facial_emotion", 1), else_=0)),
+        ).where(ChatConversation.timestamp >= week_ago)
+    ).one()
     
-    if not chats:
+    if not total:
         return {"report": "No conversations in the past week."}
     
-    total = len(chats)
-    avg_sentiment = sum(c.sentiment_score or 0 for c in chats) / total if total > 0 else 0
+    avg_sentiment = avg_sentiment or 0
     
     # Count by type
     # Chat = all conversations that are NOT speech_emotion or facial_emotion
-    speech_count = sum(1 for c in chats if c.tool_called == "speech_emotion")
-    facial_count = sum(1 for c in chats if c.tool_called == "facial_emotion")
     # Everything else (None, other tools, etc.) counts as chat
     chat_count = total - speech_count - facial_count
     
@@ -687,25 +1268,28 @@ async def get_weekly_report(db: Session = Depends(get_db)):
 
 
 @app.get("/chats/reports/monthly")
-async def get_monthly_report(db: Session = Depends(get_db)):
+def get_monthly_report(db: Session = Depends(get_db)):
     """Generate monthly mental health report."""
     month_ago = datetime.utcnow() - timedelta(days=30)
-    chats = db.query(ChatConversation).filter(
-        ChatConversation.timestamp >= month_ago
-    ).order_by(ChatConversation.timestamp.desc()).all()
+    midpoint = month_ago + timedelta(days=15)
+    # Missing sentiment scores count as 0, as they always have in the reports
+    score = func.coalesce(ChatConversation.sentiment_score, 0.0)
+    # Sentiment trend: "first half" is the most recent 15 days
+    total, avg_sentiment, first_avg, second_avg = db.execute(
+        select(
+            func.count(ChatConversation.id),
+            func.avg(score),
+            func.avg(case((ChatConversation.timestamp >= midpoint, score))),
+            func.avg(case((ChatConversation.timestamp < midpoint, score))),
+        ).where(ChatConversation.timestamp >= month_ago)
+    ).one()
     
-    if not chats:
+    if not total:
         return {"report": "No conversations in the past month."}
     
-    total = len(chats)
-    avg_sentiment = sum(c.sentiment_score or 0 for c in chats) / total if total > 0 else 0
-    
-    # Sentiment trend
-    first_half = [c for c in chats if c.timestamp >= month_ago + timedelta(days=15)]
-    second_half = [c for c in chats if c.timestamp < month_ago + timedelta(days=15)]
-    
-    first_avg = sum(c.sentiment_score or 0 for c in first_half) / len(first_half) if first_half else 0
-    second_avg = sum(c.sentiment_score or 0 for c in second_half) / len(second_half) if second_half else 0
+    avg_sentiment = avg_sentiment or 0
+    first_avg = first_avg or 0
+    second_avg = second_avg or 0
     
     trend = "improving" if second_avg > first_avg else "declining" if second_avg < first_avg else "stable"
     
@@ -720,80 +1304,123 @@ async def get_monthly_report(db: Session = Depends(get_db)):
 
 
 @app.get("/chats/export/csv")
-async def export_chats_csv(
+def export_chats_csv(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    db: Session = Depends(get_db)
 ):
-    """Export chats to CSV format."""
-    query = db.query(ChatConversation)
+    """
+    Export chats to CSV format.
+    
+    Rows are streamed from the database in chunks and written out one at a
+    time, so memory use stays flat however large the history is.
+    """
+    # The CSV has no emotion column, so don't load the JSON blobs
+    query = select(
+        ChatConversation.id,
+        ChatConversation.timestamp,
+        ChatConversation.user_message,
+        ChatConversation.assistant_response,
+        ChatConversation.tool_called,
+        ChatConversation.sentiment_score,
+        ChatConversation.conversation_length,
+    )
     
     if start_date:
         try:
-            start_dt = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
-            query = query.filter(ChatConversation.timestamp >= start_dt)
+            start_dt = _parse_ts(start_date)
+            query = query.where(ChatConversation.timestamp >= start_dt)
         except:
             pass
     
     if end_date:
         try:
-            end_dt = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
-            query = query.filter(ChatConversation.timestamp <= end_dt)
+            end_dt = _parse_ts(end_date)
+            query = query.where(ChatConversation.timestamp <= end_dt)
         except:
             pass
     
-    chats = query.order_by(ChatConversation.timestamp.desc()).all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["ID", "Timestamp", "User Message", "Assistant Response", "Tool", "Sentiment", "Length"])
-    
-    for chat in chats:
-        writer.writerow([
-            chat.id,
-            chat.timestamp.isoformat(),
-            chat.user_message,
-            chat.assistant_response,
-            chat.tool_called or "",
-            chat.sentiment_score or 0,
-            chat.conversation_length or 0
-        ])
+    query = query.order_by(ChatConversation.timestamp.desc()).execution_options(yield_per=500)
+    
+    def generate():
+        output = io.StringIO()
+        writer = csv.writer(output)
+        
+        def flush() -> str:
+            chunk = output.getvalue()
+            output.seek(0)
+            output.truncate()
+            return chunk
+        
+        writer.writerow(["ID", "Timestamp", "User Message", "Assistant Response", "Tool", "Sentiment", "Length"])
+        yield flush()
+        
+        # The session lives as long as the stream rather than the request
+        db = SessionLocal()
+        try:
+            for chat in db.execute(query):
+                writer.writerow([
+                    chat.id,
+                    chat.timestamp.isoformat(),
+                    chat.user_message,
+                    chat.assistant_response,
+                    chat.tool_called or "",
+                    chat.sentiment_score or 0,
+                    chat.conversation_length or 0
+                ])
+                yield flush()
+        finally:
+            db.close()
     
-    output.seek(0)
     return StreamingResponse(
-        iter([output.getvalue()]),
+        generate(),
         media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=echomind_history.csv"}
+        headers={
+            "Content-Disposition":
+                f"attachment; filename=echomind_history_{datetime.now().strftime('%Y%m%d')}.csv"
+        }
     )
 
 
 @app.get("/chats/warning-signs")
-async def detect_warning_signs(db: Session = Depends(get_db)):
+def detect_warning_signs(db: Session = Depends(get_db)):
     """Detect potential warning signs in recent conversations."""
     week_ago = datetime.utcnow() - timedelta(days=7)
-    recent_chats = db.query(ChatConversation).filter(
-        ChatConversation.timestamp >= week_ago
-    ).all()
+    in_window = ChatConversation.timestamp >= week_ago
+    total_checked, negative_count = db.execute(
+        select(
+            func.count(ChatConversation.id),
+            func.sum(case((ChatConversation.sentiment_score < -0.3, 1), else_=0)),
+        ).where(in_window)
+    ).one()
+    negative_count = negative_count or 0
     
     warnings = []
     
     # Check for consistently negative sentiment
-    negative_chats = [c for c in recent_chats if c.sentiment_score and c.sentiment_score < -0.3]
-    if len(negative_chats) >= 5:
+    if negative_count >= 5:
         warnings.append({
             "type": "consistently_negative",
             "severity": "medium",
-            "message": f"Detected {len(negative_chats)} conversations with negative sentiment in the past week."
+            "message": f"Detected {negative_count} conversations with negative sentiment in the past week."
         })
     
-    # Check for sudden drop in sentiment
-    if len(recent_chats) >= 3:
-        recent_sentiment = [c.sentiment_score or 0 for c in recent_chats[:3]]
-        older_sentiment = [c.sentiment_score or 0 for c in recent_chats[3:6]] if len(recent_chats) >= 6 else []
-        if older_sentiment:
-            recent_avg = sum(recent_sentiment) / len(recent_sentiment)
-            older_avg = sum(older_sentiment) / len(older_sentiment)
-            if recent_avg < older_avg - 0.3:
+    # Check for sudden drop in sentiment: the 3 newest chats vs the 3 before them
+    if total_checked >= 3:
+        latest_scores = db.execute(
+            select(ChatConversation.sentiment_score)
+            .where(in_window)
+            .order_by(ChatConversation.timestamp.desc())
+            .limit(6)
+        ).scalars().all()
+        recent_sum = older_sum = 0.0
+        for i, score in enumerate(latest_scores):
+            if i < 3:
+                recent_sum += score or 0.0
+            else:
+                older_sum += score or 0.0
+        if len(latest_scores) == 6:
+            # Only compare once both windows hold 3 scores
+            if recent_sum / 3 < older_sum / 3 - 0.3:
                 warnings.append({
                     "type": "sentiment_drop",
                     "severity": "low",
@@ -801,17 +1428,38 @@ async def detect_warning_signs(db: Session = Depends(get_db)):
                 })
     
     # Check for high frequency of conversations (possible crisis)
-    if len(recent_chats) > 20:
+    if total_checked > 20:
         warnings.append({
             "type": "high_frequency",
             "severity": "low",
-            "message": f"High frequency of conversations ({len(recent_chats)} in past week). Consider reaching out for support."
+            "message": f"High frequency of conversations ({total_checked} in past week). Consider reaching out for support."
         })
     
     return {
         "warnings": warnings,
         "checked_period": "Last 7 days",
-        "total_checked": len(recent_chats)
+        "total_checked": total_checked
+    }
+
+
+@app.get("/chats/dashboard")
+def get_dashboard(trend_days: int = 30, db: Session = Depends(get_db)):
+    """
+    Everything the History page's analytics tabs show, in one response.
+
+    Composes the stats, emotions, trends (trend_days and the last 14 days),
+    weekly/monthly report and warning-signs endpoints on one session, so
+    the page needs a single round-trip. Those endpoints remain available
+    individually.
+    """
+    return {
+        "stats": get_analytics_stats(db=db),
+        "emotions": get_emotion_distribution(db=db),
+        "trends": get_sentiment_trends(days=trend_days, db=db),
+        "recent_trends": get_sentiment_trends(days=14, db=db),
+        "weekly": get_weekly_report(db=db),
+        "monthly": get_monthly_report(db=db),
+        "warnings": detect_warning_signs(db=db),
     }
 
 
@@ -0,0 +1,35 @@
+"""
+Helpers for the exported/converted model artifacts kept under backend/models.
+"""
+
+from pathlib import Path
+from typing import Callable
+import os
+import shutil
+import tempfile
+
+
+def save_model_dir(target_dir: Path, save: Callable[[str], None]) -> None:
+    """
+    Call `save(path)` on a temporary directory next to `target_dir`, then
+    rename it to `target_dir`, so an interrupted save never leaves a partial
+    copy behind.
+
+    A failed save is reported and otherwise ignored, since the caller already
+    has the model loaded in memory.
+    """
+    tmp_dir = None
+    try:
+        target_dir.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=f".{target_dir.name}-", dir=target_dir.parent)
+        save(tmp_dir)
+        if target_dir.exists():
+            # A partial copy left by an older, interrupted save
+            shutil.rmtree(target_dir)
+        os.replace(tmp_dir, target_dir)
+        tmp_dir = None
+    except Exception as e:
+        print(f"Saving model files to {target_dir} failed: {e}")
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -2,7 +2,10 @@
 Sentiment analysis utilities for chat conversations.
 """
 
-from typing import Dict, Optional
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import math
 import re
 
 try:
@@ -11,19 +14,53 @@ try:
 except ImportError:
     VADER_AVAILABLE = False
 
-_sentiment_analyzer = None
+_NEUTRAL_SCORES = (("neg", 0.0), ("neu", 1.0), ("pos", 0.0), ("compound", 0.0))
 
+# Labels for compound scores <= -0.05, in between, and >= 0.05. The upper
+# threshold sits just below 0.05 so bisect_left puts 0.05 itself in "Positive".
+_SENTIMENT_THRESHOLDS = (-0.05, math.nextafter(0.05, -math.inf))
+_SENTIMENT_LABELS = ("Negative", "Neutral", "Positive")
 
+# VADER's emoji handling gets pathologically slow on emoji-heavy input, so
+# long texts are scored on their first MAX_SENTIMENT_CHARS characters and
+# texts with more than MAX_SENTIMENT_EMOJIS emoji are treated as neutral.
+MAX_SENTIMENT_CHARS = 4000
+MAX_SENTIMENT_EMOJIS = 64
+_EMOJI_RE = re.compile("[\U0001F300-\U0001FAFF\u2600-\u27BF]")
+
+
+@lru_cache(maxsize=1)
 def _get_sentiment_analyzer():
-    """Lazily load sentiment analyzer."""
-    global _sentiment_analyzer
-    if _sentiment_analyzer is None:
-        if not VADER_AVAILABLE:
-            raise ImportError(
-                "vaderSentiment not installed. Install with: pip install vaderSentiment"
-            )
-        _sentiment_analyzer = SentimentIntensityAnalyzer()
-    return _sentiment_analyzer
+    """Lazily load sentiment analyzer, once per process."""
+    if not VADER_AVAILABLE:
+        raise ImportError(
+            "vaderSentiment not installed. Install with: pip install vaderSentiment"
+        )
+    return SentimentIntensityAnalyzer()
+
+
+def preload_sentiment_analyzer() -> None:
+    """
+    Build the VADER analyzer (and parse its lexicon) ahead of the first request.
+    """
+    try:
+        _get_sentiment_analyzer()
+    except Exception as e:
+        print(f"Sentiment analyzer preload failed: {str(e)}")
+
+
+@lru_cache(maxsize=10_000)
+def _polarity_scores(text: str) -> Tuple[Tuple[str, float], ...]:
+    """
+    VADER scores for a text, memoized since short messages ("hello",
+    "i'm sad") recur often. Returned as a tuple so the cached value can't
+    be mutated by callers. Callers truncate to MAX_SENTIMENT_CHARS first,
+    so the cache never holds more than that per entry.
+    """
+    if len(_EMOJI_RE.findall(text)) > MAX_SENTIMENT_EMOJIS:
+        return _NEUTRAL_SCORES
+    analyzer = _get_sentiment_analyzer()
+    return tuple(analyzer.polarity_scores(text).items())
 
 
 def analyze_sentiment(text: str) -> Dict[str, float]:
@@ -37,16 +74,36 @@ def analyze_sentiment(text: str) -> Dict[str, float]:
         Dictionary with 'compound', 'pos', 'neu', 'neg' scores.
         Compound score ranges from -1 (most negative) to +1 (most positive).
     """
-    if not text or not text.strip():
-        return {"compound": 0.0, "pos": 0.0, "neu": 1.0, "neg": 0.0}
+    # isspace() stops at the first non-blank character and, unlike strip(),
+    # doesn't copy the text
+    if not text or text.isspace():
+        return dict(_NEUTRAL_SCORES)
     
     try:
-        analyzer = _get_sentiment_analyzer()
-        scores = analyzer.polarity_scores(text)
-        return scores
+        return dict(_polarity_scores(text[:MAX_SENTIMENT_CHARS]))
     except Exception:
         # Fallback: simple heuristic
-        return {"compound": 0.0, "pos": 0.0, "neu": 1.0, "neg": 0.0}
+        return dict(_NEUTRAL_SCORES)
+
+
+def analyze_sentiments(texts: List[str]) -> List[Dict[str, float]]:
+    """
+    Analyze sentiment of many texts in one pass.
+    
+    Args:
+        texts: Texts to analyze.
+    
+    Returns:
+        One score dictionary per text, as returned by analyze_sentiment().
+    """
+    scores = _polarity_scores
+    results = []
+    for text in texts:
+        try:
+            results.append(dict(scores(text[:MAX_SENTIMENT_CHARS]) if text and not text.isspace() else _NEUTRAL_SCORES))
+        except Exception:
+            results.append(dict(_NEUTRAL_SCORES))
+    return results
 
 
 def get_sentiment_label(compound_score: float) -> str:
@@ -59,12 +116,7 @@ def get_sentiment_label(compound_score: float) -> str:
     Returns:
         Sentiment label: "Positive", "Neutral", or "Negative".
     """
-    if compound_score >= 0.05:
-        return "Positive"
-    elif compound_score <= -0.05:
-        return "Negative"
-    else:
-        return "Neutral"
+    return _SENTIMENT_LABELS[bisect_left(_SENTIMENT_THRESHOLDS, compound_score)]
 
 
 def calculate_conversation_length(user_message: str, assistant_response: str) -> int:
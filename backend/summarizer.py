@@ -0,0 +1,165 @@
+"""
+Cheap local summarization helpers used before (or instead of) the LLM.
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional
+import math
+import re
+
+from sentiment_analysis import analyze_sentiments, get_sentiment_label
+
+# Histories of at most this many chats are summarized locally without calling the LLM.
+LOCAL_SUMMARY_MAX_CHATS = 2
+
+# Supportive lines for the emotion endpoints, keyed on the primary emotion.
+# {source} is "voice" or "expression".
+EMOTION_TEMPLATES = {
+    "neutral": (
+        "Your {source} seems fairly calm and steady right now. "
+        "If anything is on your mind, I'm here to listen whenever you're ready."
+    ),
+    "happy": (
+        "There's a real brightness in your {source}, and it's lovely to see. "
+        "Take a moment to notice what's lifting you up today."
+    ),
+    "sad": (
+        "I can sense some heaviness in your {source}, and that matters. "
+        "It's okay to feel this way; you don't have to carry it alone."
+    ),
+    "angry": (
+        "Your {source} carries some tension or frustration right now. "
+        "Those feelings are valid, and a slow breath or a short pause might help you reset."
+    ),
+    "fear": (
+        "I notice some worry or unease in your {source}. "
+        "You're safe to share what's troubling you, and we can take it one step at a time."
+    ),
+    "disgust": (
+        "Your {source} suggests something is bothering or unsettling you. "
+        "It's okay to step back from it and talk it through if you'd like."
+    ),
+    "surprise": (
+        "Your {source} shows a sense of surprise. "
+        "Unexpected moments can stir up a lot, so give yourself a little time to take it in."
+    ),
+}
+
+# Short model labels (the speech model uses these) mapped to template keys.
+_EMOTION_ALIASES = {"neu": "neutral", "hap": "happy", "ang": "angry", "fearful": "fear"}
+
+_TOKEN_RE = re.compile(r"[a-z']+")
+
+# Very common words that would otherwise dominate short chat messages.
+_STOP_WORDS = frozenset(
+    "a an and are as at be but by do for from have i i'm im in is it it's its me my "
+    "of on or so that the this to was what with you your".split()
+)
+
+
+def _tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOP_WORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough LLM token count for English text (about 4 characters per token).
+
+    Good enough for prompt budgeting without shipping the provider's
+    tokenizer.
+    """
+    return len(text) // 4 + 1
+
+
+def emotion_template_summary(primary: str, source: str) -> Optional[str]:
+    """
+    Look up a canned supportive summary for a detected emotion.
+
+    Args:
+        primary: Primary emotion label from the voice or face model.
+        source: What was analyzed, e.g. "voice" or "expression".
+
+    Returns:
+        Two-sentence summary, or None if the emotion has no template.
+    """
+    key = (primary or "").strip().lower()
+    template = EMOTION_TEMPLATES.get(_EMOTION_ALIASES.get(key, key))
+    return template.format(source=source) if template else None
+
+
+def template_summary(chats: List[Dict]) -> str:
+    """
+    Build a short summary of a handful of conversations without the LLM.
+
+    Args:
+        chats: Chat dicts with 'user_message', 'sentiment_score' and 'tool_called'.
+
+    Returns:
+        Plain-text summary.
+    """
+    scores = [chat.get("sentiment_score") for chat in chats]
+    # Score any chats the client sent without a stored sentiment in one pass
+    missing = [idx for idx, score in enumerate(scores) if score is None]
+    if missing:
+        fresh = analyze_sentiments([chats[idx].get("user_message", "") for idx in missing])
+        for idx, result in zip(missing, fresh):
+            scores[idx] = result.get("compound", 0.0)
+
+    tools = []
+    for chat in chats:
+        if chat.get("tool_called") and chat["tool_called"] not in tools:
+            tools.append(chat["tool_called"])
+
+    avg_score = sum(scores) / len(scores) if scores else 0.0
+    count = len(chats)
+    parts = [
+        f"You have {count} conversation{'s' if count != 1 else ''} so far, "
+        f"with an overall {get_sentiment_label(avg_score).lower()} tone ({avg_score:+.2f})."
+    ]
+
+    topics = [chat.get("user_message", "").strip() for chat in chats if chat.get("user_message")]
+    if topics:
+        parts.append("Topics discussed: " + "; ".join(
+            t if len(t) <= 80 else t[:77] + "..." for t in topics
+        ) + ".")
+    if tools:
+        parts.append("Tools used: " + ", ".join(tools) + ".")
+    parts.append("Keep talking with EchoMind to build a fuller picture of your journey.")
+
+    return " ".join(parts)
+
+
+def select_salient_chats(chats: List[Dict], k: int) -> List[Dict]:
+    """
+    Pick the k chats whose user messages carry the most TF-IDF weight.
+
+    Each message is scored by the sum of its terms' TF-IDF weights across
+    the given chats, so substantial messages with distinctive content win
+    over short or generic ones. The selected chats keep their original order.
+
+    Args:
+        chats: Chat dicts with a 'user_message' key.
+        k: Maximum number of chats to keep.
+
+    Returns:
+        Up to k chats from the input list.
+    """
+    if len(chats) <= k:
+        return list(chats)
+
+    docs = [Counter(_tokenize(chat.get("user_message", ""))) for chat in chats]
+    doc_freq = Counter()
+    for terms in docs:
+        doc_freq.update(terms.keys())
+
+    n_docs = len(docs)
+    scores = []
+    for idx, terms in enumerate(docs):
+        score = sum(
+            tf * (math.log((1 + n_docs) / (1 + doc_freq[term])) + 1)
+            for term, tf in terms.items()
+        )
+        scores.append((score, idx))
+
+    keep = sorted(idx for _, idx in sorted(scores, reverse=True)[:k])
+    return [chats[idx] for idx in keep]
@@ -0,0 +1,164 @@
+"""
+Shared HTTP session for the Streamlit pages' calls to the backend.
+"""
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Enough pooled connections for the History page's concurrent analytics fetches
+POOL_SIZE = 10
+
+# Default entries kept per stale-while-revalidate cached function
+SWR_MAX_ENTRIES = 128
+
+_swr_refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="swr-refresh")
+# Cache state per decorated function, keyed by qualified name so it survives
+# Streamlit re-executing the page script (and re-decorating) on every rerun
+_swr_caches = {}
+
+# After this many consecutive connection failures, fail fast for
+# CIRCUIT_OPEN_SECONDS instead of retrying against a backend that is down.
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_OPEN_SECONDS = 10.0
+
+
+class _CircuitBreakerAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that stops trying to connect while the backend looks down.
+
+    Each send already retries failed connections (see get_session). Once
+    CIRCUIT_FAILURE_THRESHOLD sends in a row still fail to connect, further
+    requests raise ConnectionError immediately until CIRCUIT_OPEN_SECONDS
+    have passed, so reruns don't each wait out a full set of retries.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+
+    def send(self, request, *args, **kwargs):
+        with self._lock:
+            if time.monotonic() < self._open_until:
+                raise requests.exceptions.ConnectionError(
+                    "Backend unavailable; not retrying for a few seconds.", request=request
+                )
+        try:
+            response = super().send(request, *args, **kwargs)
+        except requests.exceptions.ConnectionError:
+            with self._lock:
+                self._failures += 1
+                if self._failures >= CIRCUIT_FAILURE_THRESHOLD:
+                    self._open_until = time.monotonic() + CIRCUIT_OPEN_SECONDS
+                    self._failures = 0
+            raise
+        with self._lock:
+            self._failures = 0
+        return response
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """
+    Return a process-wide requests.Session with keep-alive connection pooling.
+
+    Cached with st.cache_resource so every page and every rerun reuses the
+    same pooled connections to the backend instead of opening a new TCP
+    connection per request. Failed connection attempts (e.g. while the
+    backend reloads) are retried twice with exponential backoff, and a
+    circuit breaker skips the backend briefly after repeated failures.
+    """
+    session = requests.Session()
+    adapter = _CircuitBreakerAdapter(
+        pool_connections=POOL_SIZE,
+        pool_maxsize=POOL_SIZE,
+        max_retries=Retry(total=2, backoff_factor=0.2),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def decode_json(response: requests.Response):
+    """
+    Decode a backend response body as JSON with orjson.
+
+    Parses the raw bytes directly, skipping requests' charset detection and
+    text decoding along with the stdlib json parser.
+    """
+    return orjson.loads(response.content)
+
+
+def swr_cache(ttl_fresh: float, ttl_stale: float, max_entries: int = SWR_MAX_ENTRIES):
+    """
+    Cache a fetch function's results with stale-while-revalidate semantics.
+
+    Results younger than ttl_fresh seconds are returned as-is. Results up
+    to ttl_stale seconds old are returned immediately while a background
+    thread fetches a fresh value for the next call. Older (or missing)
+    results are fetched synchronously. Entries are shared process-wide,
+    like st.cache_data, and keyed on the call's arguments; past max_entries
+    the least recently used is dropped.
+
+    The wrapped function must not call Streamlit UI commands, since
+    refreshes run outside the script thread.
+    """
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+        if name not in _swr_caches:
+            # key -> (value, fetched_at), keys currently being refreshed, lock
+            _swr_caches[name] = (OrderedDict(), set(), threading.Lock())
+        entries, refreshing, lock = _swr_caches[name]
+
+        def store(key, value):
+            with lock:
+                entries[key] = (value, time.monotonic())
+                entries.move_to_end(key)
+                while len(entries) > max_entries:
+                    entries.popitem(last=False)
+
+        def refresh(key, args, kwargs):
+            try:
+                store(key, fn(*args, **kwargs))
+            finally:
+                with lock:
+                    refreshing.discard(key)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            with lock:
+                entry = entries.get(key)
+                if entry is not None:
+                    age = time.monotonic() - entry[1]
+                    if age < ttl_fresh:
+                        return entry[0]
+                    if age < ttl_stale:
+                        if key not in refreshing:
+                            refreshing.add(key)
+                            _swr_refresher.submit(refresh, key, args, kwargs)
+                        return entry[0]
+            value = fn(*args, **kwargs)
+            store(key, value)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def clear_swr_caches() -> None:
+    """Drop every swr_cache entry, e.g. after deleting data."""
+    for entries, _, lock in _swr_caches.values():
+        with lock:
+            entries.clear()
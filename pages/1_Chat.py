@@ -1,7 +1,12 @@
+import orjson
 import streamlit as st
 import requests
 
-BACKEND_URL = "http://localhost:8000/ask"
+from backend_client import get_session
+
+BACKEND_URL = "http://localhost:8000/ask/stream"
+# Pooled keep-alive connections shared across pages and reruns
+session = get_session()
 
 st.set_page_config(page_title="EchoMind - Chat", layout="wide")
 
@@ -14,36 +19,66 @@ if "chat_history" not in st.session_state:
 st.markdown("Talk to EchoMind using text. For voice-based emotion analysis, use the **Voice** page in the sidebar.")
 st.markdown("---")
 
-# Text chat input
-user_input = st.chat_input("What's on your mind today?")
-if user_input:
-    # Append user message
-    st.session_state.chat_history.append({"role": "user", "content": user_input})
 
-    # AI Agent exists here
-    try:
-        response = requests.post(BACKEND_URL, json={"message": user_input})
-        if response.status_code == 200:
-            response_data = response.json()
-            tool_info = f' WITH TOOL: [{response_data["tool_called"]}]' if response_data.get("tool_called") and response_data["tool_called"] != "None" else ""
-            st.session_state.chat_history.append({
-                "role": "assistant",
-                "content": f'{response_data["response"]}{tool_info}'
-            })
-        else:
-            st.session_state.chat_history.append({
-                "role": "assistant",
-                "content": "Sorry, I'm having trouble connecting to the backend. Please make sure the server is running."
-            })
-    except requests.exceptions.ConnectionError:
-        st.session_state.chat_history.append({
-            "role": "assistant",
-            "content": "⚠️ Cannot connect to backend. Please start the backend server first (uv run backend/main.py)"
-        })
+class StreamError(Exception):
+    """The backend reported a failure partway through a streamed reply."""
+
+
+def stream_reply(response, result):
+    """
+    Yield reply text from the backend's NDJSON stream as it arrives.
+
+    The final response and tool name are stored in `result` once the
+    stream's closing line has been read. An error line from the backend is
+    raised as StreamError.
+    """
+    for line in response.iter_lines():
+        if not line:
+            continue
+        event = orjson.loads(line)
+        if "error" in event:
+            raise StreamError(event["error"])
+        if event.get("done"):
+            result["response"] = event.get("response") or ""
+            result["tool_called"] = event.get("tool_called")
+        elif "delta" in event:
+            yield event["delta"]
+
 
 # Show conversation
 for msg in st.session_state.chat_history:
     with st.chat_message(msg["role"]):
         st.write(msg["content"])
 
+# Text chat input
+user_input = st.chat_input("What's on your mind today?")
+if user_input:
+    # Append user message
+    st.session_state.chat_history.append({"role": "user", "content": user_input})
+    with st.chat_message("user"):
+        st.write(user_input)
+
+    # AI Agent exists here
+    with st.chat_message("assistant"):
+        try:
+            with session.post(BACKEND_URL, json={"message": user_input}, stream=True, timeout=120) as response:
+                if response.status_code == 200:
+                    result = {}
+                    streamed = st.write_stream(stream_reply(response, result))
+                    content = result.get("response", streamed if isinstance(streamed, str) else "")
+                    tool_called = result.get("tool_called")
+                    tool_info = f' WITH TOOL: [{tool_called}]' if tool_called and tool_called != "None" else ""
+                    if tool_info:
+                        st.write(tool_info.strip())
+                    content = f"{content}{tool_info}"
+                else:
+                    content = "Sorry, I'm having trouble connecting to the backend. Please make sure the server is running."
+                    st.write(content)
+        except requests.exceptions.ConnectionError:
+            content = "⚠️ Cannot connect to backend. Please start the backend server first (uv run backend/main.py)"
+            st.write(content)
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError, StreamError) as e:
+            content = f"Sorry, the reply was interrupted: {str(e)}"
+            st.error(content)
 
+    st.session_state.chat_history.append({"role": "assistant", "content": content})
@@ -1,7 +1,13 @@
 import streamlit as st
 import requests
 
+from backend_client import decode_json, get_session
+
 BACKEND_FACE_URL = "http://localhost:8000/analyze_face"
+IMAGE_TYPES = ["jpg", "jpeg", "png", "bmp"]
+VIDEO_TYPES = ["mp4", "avi", "mov", "mkv"]
+# Pooled keep-alive connections shared across pages and reruns
+session = get_session()
 
 st.set_page_config(page_title="EchoMind - Facial Emotion", layout="wide")
 
@@ -24,7 +30,7 @@ with tab_photo:
         st.markdown("#### Upload Image")
         uploaded_file = st.file_uploader(
             "Choose an image file",
-            type=["jpg", "jpeg", "png", "bmp"],
+            type=IMAGE_TYPES,
             help="Upload a photo containing your face",
             key="photo_upload"
         )
@@ -53,11 +59,12 @@ with tab_photo:
                     photo_to_analyze.seek(0)
                     # Use content_type if available, otherwise infer from filename
                     content_type = getattr(photo_to_analyze, 'content_type', None) or getattr(photo_to_analyze, 'type', None) or 'image/jpeg'
-                    files = {"file": (photo_to_analyze.name, photo_to_analyze.read(), content_type)}
-                    resp = requests.post(BACKEND_FACE_URL, files=files, timeout=120)
+                    # Pass the file object itself rather than a .read() copy of it
+                    files = {"file": (photo_to_analyze.name, photo_to_analyze, content_type)}
+                    resp = session.post(BACKEND_FACE_URL, files=files, timeout=120)
                     
                     if resp.status_code == 200:
-                        data = resp.json()
+                        data = decode_json(resp)
                         primary = data.get("primary_emotion", "unknown")
                         emotions = data.get("emotions", [])
                         gpt_summary = data.get("gpt_summary") or ""
@@ -91,7 +98,7 @@ with tab_photo:
                                 "so you can review it later in the **History** page."
                             )
                     else:
-                        error_msg = resp.json().get("detail", f"Status {resp.status_code}")
+                        error_msg = decode_json(resp).get("detail", f"Status {resp.status_code}")
                         st.error(f"Failed to analyze image: {error_msg}")
                         
                 except requests.exceptions.ConnectionError:
@@ -110,7 +117,7 @@ with tab_video:
     
     uploaded_video = st.file_uploader(
         "Choose a video file",
-        type=["mp4", "avi", "mov", "mkv"],
+        type=VIDEO_TYPES,
         help="Upload a video containing your face. The middle frame will be analyzed.",
         key="video_upload"
     )
@@ -128,11 +135,12 @@ with tab_video:
                     uploaded_video.seek(0)
                     # Use content_type if available, otherwise infer from filename
                     content_type = getattr(uploaded_video, 'content_type', None) or getattr(uploaded_video, 'type', None) or 'video/mp4'
-                    files = {"file": (uploaded_video.name, uploaded_video.read(), content_type)}
-                    resp = requests.post(BACKEND_FACE_URL, files=files, timeout=120)
+                    # Pass the file object itself rather than a .read() copy of it
+                    files = {"file": (uploaded_video.name, uploaded_video, content_type)}
+                    resp = session.post(BACKEND_FACE_URL, files=files, timeout=120)
                     
                     if resp.status_code == 200:
-                        data = resp.json()
+                        data = decode_json(resp)
                         primary = data.get("primary_emotion", "unknown")
                         emotions = data.get("emotions", [])
                         gpt_summary = data.get("gpt_summary") or ""
@@ -166,7 +174,7 @@ with tab_video:
                                 "so you can review it later in the **History** page."
                             )
                     else:
-                        error_msg = resp.json().get("detail", f"Status {resp.status_code}")
+                        error_msg = decode_json(resp).get("detail", f"Status {resp.status_code}")
                         st.error(f"Failed to analyze video: {error_msg}")
                         
                 except requests.exceptions.ConnectionError:
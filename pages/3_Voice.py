@@ -1,9 +1,12 @@
 import streamlit as st
 import requests
 
+from backend_client import decode_json, get_session
 from st_audiorec import st_audiorec
 
 BACKEND_AUDIO_URL = "http://localhost:8000/analyze_audio"
+# Pooled keep-alive connections shared across pages and reruns
+session = get_session()
 
 st.set_page_config(page_title="EchoMind - Speech Emotion", layout="wide")
 
@@ -28,9 +31,9 @@ with col_info:
             with st.spinner("Analyzing your voice emotions..."):
                 try:
                     files = {"file": ("voice_recording.wav", audio_bytes, "audio/wav")}
-                    resp = requests.post(BACKEND_AUDIO_URL, files=files, timeout=120)
+                    resp = session.post(BACKEND_AUDIO_URL, files=files, timeout=120)
                     if resp.status_code == 200:
-                        data = resp.json()
+                        data = decode_json(resp)
                         analysis = data.get("analysis") or "No analysis available."
                         primary = data.get("primary_emotion", "unknown")
                         emotions = data.get("emotions", [])
@@ -1,13 +1,57 @@
 # Enhanced Chat History Page with Analytics
 import streamlit as st
 import requests
+import calendar
+import gzip
+import hashlib
 from datetime import datetime, timedelta
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from io import BytesIO
+import numpy as np
+from urllib.parse import urlencode
+
+from backend_client import clear_swr_caches, decode_json, get_session, swr_cache
 
 BACKEND_URL = "http://localhost:8000"
+FILTERED_CHATS_URL = f"{BACKEND_URL}/chats/filtered"
+DASHBOARD_URL = f"{BACKEND_URL}/chats/dashboard"
+STREAM_CHATS_URL = f"{BACKEND_URL}/chats/stream"
+EXPORT_CSV_URL = f"{BACKEND_URL}/chats/export/csv"
+SUMMARIZE_URL = f"{BACKEND_URL}/summarize"
+# Search covers this many of the latest chats matching the sidebar filters
+SEARCH_WINDOW = 500
+SEARCH_MAX_RESULTS = 50
+SEARCH_MIN_CHARS = 2
+# Chat list responses kept in memory; search windows hold up to
+# SEARCH_WINDOW chats each, so far fewer than the swr_cache default
+HISTORY_CACHE_ENTRIES = 16
+NDJSON_GZIP_HEADERS = {"Content-Encoding": "gzip", "Content-Type": "application/x-ndjson"}
+# Conversation list: message preview length and display names for tools
+PREVIEW_CHARS = 80
+TOOL_LABELS = {
+    "speech_emotion": "🎧 Speech Emotion Analysis",
+    "facial_emotion": "😊 Facial Emotion Analysis",
+}
+# AI summaries kept per session, oldest dropped first
+SUMMARY_CACHE_SIZE = 8
+# Views of the main area; only the selected one runs on each rerun
+CONVERSATIONS_VIEW = "📋 Conversations"
+ANALYTICS_VIEW = "📊 Analytics"
+TRENDS_VIEW = "📈 Trends"
+REPORTS_VIEW = "📅 Reports"
+INSIGHTS_VIEW = "⚠️ Insights"
+# Chat field each backend sort orders by (ties broken by id)
+SORT_CURSOR_FIELDS = {
+    "newest": "timestamp",
+    "oldest": "timestamp",
+    "longest": "conversation_length",
+    "shortest": "conversation_length",
+    "most_positive": "sentiment_score",
+    "most_negative": "sentiment_score",
+}
+# Pooled keep-alive connections shared across pages and reruns
+session = get_session()
 st.set_page_config(page_title="History", layout="wide")
 
 st.title("📜 History & Analytics")
@@ -16,122 +60,313 @@ st.markdown("View your conversations, track your mental health journey, and gain
 # Initialize session state
 if "page_number" not in st.session_state:
     st.session_state.page_number = 0
+# Keyset cursors: history_cursors[n] holds the cursor params for the last row
+# before page n, so "Next"/"Previous" never need an OFFSET scan.
+if "history_cursors" not in st.session_state:
+    st.session_state.history_cursors = [None]
+if "history_filters_key" not in st.session_state:
+    st.session_state.history_filters_key = None
 if "items_per_page" not in st.session_state:
     st.session_state.items_per_page = 10
+# AI summaries keyed by a digest of the chats they summarize
+if "summary_cache" not in st.session_state:
+    st.session_state.summary_cache = {}
+if "summary_text" not in st.session_state:
+    st.session_state.summary_text = None
 
 # ==================== HELPER FUNCTIONS ====================
 
-@st.cache_data(ttl=10)
-def fetch_chat_history(skip=0, limit=1000, **filters):
+@swr_cache(ttl_fresh=10, ttl_stale=60, max_entries=HISTORY_CACHE_ENTRIES)
+def fetch_chat_history(skip=0, limit=100, **filters):
     """Fetch chat history from backend API with filters"""
     try:
         params = {"skip": skip, "limit": limit}
         params.update(filters)
-        response = requests.get(f"{BACKEND_URL}/chats/filtered", params=params, timeout=10)
+        response = session.get(FILTERED_CHATS_URL, params=params, timeout=10)
         if response.status_code == 200:
-            return response.json()
+            return decode_json(response)
         return []
     except requests.exceptions.ConnectionError:
         return None
     except Exception as e:
-        st.error(f"Error fetching chats: {str(e)}")
+        print(f"Error fetching chats: {str(e)}")
         return []
 
-@st.cache_data(ttl=30)
-def fetch_analytics_stats():
-    """Fetch analytics statistics"""
-    try:
-        response = requests.get(f"{BACKEND_URL}/chats/analytics/stats", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return {}
-    except:
-        return {}
-
-@st.cache_data(ttl=30)
-def fetch_sentiment_trends(days=30):
-    """Fetch sentiment trends"""
-    try:
-        response = requests.get(f"{BACKEND_URL}/chats/analytics/trends", params={"days": days}, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return []
-    except:
-        return []
+def next_cursor(last_chat, sort_by):
+    """Keyset cursor params for the page after the one ending with last_chat"""
+    cursor = {"cursor_id": last_chat["id"]}
+    field = SORT_CURSOR_FIELDS.get(sort_by, "timestamp")
+    value = last_chat.get(field)
+    if value is not None:
+        cursor["cursor_ts" if field == "timestamp" else "cursor_value"] = value
+    return cursor
 
-@st.cache_data(ttl=30)
-def fetch_emotion_distribution():
-    """Fetch emotion distribution"""
-    try:
-        response = requests.get(f"{BACKEND_URL}/chats/analytics/emotions", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return {}
-    except:
-        return {}
+def search_chats(chats, search_term):
+    """Return the chats whose message or response contains search_term, ignoring case"""
+    # Build the searchable text column once and reuse it for every keystroke
+    # until a different set of chats is searched (chats are never edited)
+    ids = tuple(chat["id"] for chat in chats)
+    index = st.session_state.get("history_search_index")
+    if index is None or index[0] != ids:
+        index = (ids, pd.Series([
+            f"{chat.get('user_message', '')}\n{chat.get('assistant_response', '')}"
+            for chat in chats
+        ]))
+        st.session_state.history_search_index = index
+    mask = index[1].str.contains(search_term, case=False, regex=False)
+    return [chat for chat, matched in zip(chats, mask) if matched]
 
-@st.cache_data(ttl=30)
-def fetch_weekly_report():
-    """Fetch weekly report"""
-    try:
-        response = requests.get(f"{BACKEND_URL}/chats/reports/weekly", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return {}
-    except:
-        return {}
-
-@st.cache_data(ttl=30)
-def fetch_monthly_report():
-    """Fetch monthly report"""
-    try:
-        response = requests.get(f"{BACKEND_URL}/chats/reports/monthly", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return {}
-    except:
-        return {}
-
-@st.cache_data(ttl=30)
-def fetch_warning_signs():
-    """Fetch warning signs"""
+# Aggregates move slowly, so they stay fresh longer than the chat list
+@swr_cache(ttl_fresh=60, ttl_stale=600)
+def fetch_analytics(trend_days=30):
+    """Fetch everything the analytics tabs need in one request"""
+    defaults = {
+        "stats": {}, "emotions": {}, "trends": [], "recent_trends": [],
+        "weekly": {}, "monthly": {}, "warnings": {},
+    }
     try:
-        response = requests.get(f"{BACKEND_URL}/chats/warning-signs", timeout=10)
+        response = session.get(DASHBOARD_URL, params={"trend_days": trend_days}, timeout=10)
         if response.status_code == 200:
-            return response.json()
-        return {}
+            return {**defaults, **decode_json(response)}
+        return defaults
     except:
-        return {}
+        return defaults
 
 def delete_chat(chat_id):
     """Delete a chat conversation"""
     try:
-        response = requests.delete(f"{BACKEND_URL}/chats/{chat_id}", timeout=10)
+        response = session.delete(f"{BACKEND_URL}/chats/{chat_id}", timeout=10)
         if response.status_code == 200:
             st.success(f"Conversation #{chat_id} deleted successfully")
-            st.cache_data.clear()
+            clear_swr_caches()
             st.rerun()
         else:
             st.error(f"Failed to delete conversation: {response.status_code}")
     except Exception as e:
         st.error(f"Error deleting conversation: {str(e)}")
 
-def export_to_csv(start_date=None, end_date=None):
-    """Export chats to CSV"""
-    try:
-        params = {}
-        if start_date:
-            params["start_date"] = start_date.isoformat()
-        if end_date:
-            params["end_date"] = end_date.isoformat()
+def export_csv_url(start_date=None, end_date=None):
+    """Backend CSV export URL for the given date range"""
+    params = {}
+    if start_date:
+        params["start_date"] = start_date.isoformat()
+    if end_date:
+        params["end_date"] = end_date.isoformat()
+    return f"{EXPORT_CSV_URL}?{urlencode(params)}" if params else EXPORT_CSV_URL
+
+# ==================== CHART BUILDERS ====================
+# Widget interactions rerun the whole script, so figures are cached on their
+# inputs and only rebuilt when the analytics data actually changes.
+
+@st.cache_data(ttl=60)
+def build_sentiment_pie(positive, neutral, negative):
+    """Pie chart of positive/neutral/negative conversation counts"""
+    return px.pie(
+        values=[positive, neutral, negative],
+        names=["Positive", "Neutral", "Negative"],
+        title="Sentiment Breakdown",
+        color_discrete_map={"Positive": "green", "Neutral": "gray", "Negative": "red"}
+    )
+
+@st.cache_data(ttl=60)
+def build_count_bar(counts, title, x_label, y_label):
+    """Bar chart of a {label: count} mapping"""
+    return px.bar(
+        x=list(counts.keys()),
+        y=list(counts.values()),
+        title=title,
+        labels={"x": x_label, "y": y_label}
+    )
+
+@st.cache_data(ttl=60)
+def build_trend_line(trends, days):
+    """Daily average sentiment line chart from /chats/trends rows"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=pd.to_datetime([row['date'] for row in trends]),
+        y=[row['avg_sentiment'] for row in trends],
+        mode='lines+markers',
+        name='Average Sentiment',
+        line=dict(color='#667eea', width=2),
+        fill='tonexty',
+        fillcolor='rgba(102, 126, 234, 0.1)'
+    ))
+    fig.add_hline(y=0, line_dash="dash", line_color="gray", annotation_text="Neutral")
+    fig.update_layout(
+        title=f"Sentiment Trend (Last {days} Days)",
+        xaxis_title="Date",
+        yaxis_title="Sentiment Score (-1 to +1)",
+        hovermode='x unified'
+    )
+    return fig
+
+@st.cache_data(ttl=60)
+def build_heatmap(trends):
+    """Day-of-week by ISO-week activity heatmap from /chats/trends rows"""
+    dates = pd.DatetimeIndex(pd.to_datetime([row['date'] for row in trends]))
+    counts = np.array([row['count'] for row in trends], dtype=np.int64)
+    weeks, week_idx = np.unique(dates.isocalendar().week.to_numpy(), return_inverse=True)
+
+    # Rows are weekdays (Monday=0), columns the ISO weeks present
+    heatmap_data = np.zeros((7, len(weeks)), dtype=np.int64)
+    np.add.at(heatmap_data, (dates.weekday.to_numpy(), week_idx), counts)
+
+    return px.imshow(
+        heatmap_data,
+        x=[int(week) for week in weeks],
+        y=list(calendar.day_name),
+        labels=dict(x="Week", y="Day of Week", color="Conversations"),
+        title="Conversation Activity Heatmap",
+        aspect="auto"
+    )
+
+# ==================== CONVERSATION LIST ====================
+
+def sentiment_label(score):
+    """Positive/Neutral/Negative label for a sentiment score"""
+    if score and score > 0.05:
+        return "Positive"
+    if score and score < -0.05:
+        return "Negative"
+    return "Neutral"
+
+def render_chat_detail(chat):
+    """Show one conversation in full, with its emotions and a Delete button"""
+    formatted_time = chat.get("timestamp_display") or str(chat.get("timestamp", "Unknown time"))
+    sentiment_score = chat.get("sentiment_score")
+
+    st.markdown(f"**💬 Conversation #{chat['id']}**")
+    st.markdown(f"**🕐 Time:** {formatted_time}")
+    if sentiment_score is not None:
+        st.markdown(f"**😊 Sentiment:** {sentiment_label(sentiment_score)} ({sentiment_score:.3f})")
+    if chat.get("tool_called"):
+        tool = chat["tool_called"]
+        st.markdown(f"**🔧 Tool:** {TOOL_LABELS.get(tool, tool)}")
+    if chat.get("conversation_length"):
+        st.caption(f"Length: {chat['conversation_length']} chars")
+
+    # User message
+    st.markdown("**👤 You:**")
+    st.info(chat.get("user_message", ""))
+
+    # Assistant response
+    st.markdown("**🤖 EchoMind:**")
+    st.success(chat.get("assistant_response", ""))
+
+    # Emotion data if available
+    emotion_data = chat.get("emotion_data")
+    if emotion_data:
+        st.markdown("**🎭 Detected Emotions:**")
+        emotions = emotion_data.get("emotions", [])
+        if emotions:
+            for em in emotions[:5]:  # Show top 5
+                if isinstance(em, dict):
+                    label = em.get("emotion") or em.get("label", "unknown")
+                    score = em.get("score", 0.0)
+                    st.write(f"- **{label}**: {score:.2%}")
+
+    if st.button("🗑️ Delete", key=f"delete_{chat['id']}", width='stretch'):
+        delete_chat(chat['id'])
+
+@st.fragment
+def render_conversations(filters):
+    """
+    Render the conversation list, search box and pagination.
+
+    Runs as a fragment, so paging and searching rerun only this part of the
+    page rather than the whole script. Sidebar changes still trigger a full
+    rerun, which calls it again with the new filters.
+    """
+    # Fragment reruns pass the same dict again, so add cursors to a copy
+    filters = dict(filters)
+
+    # Fetch chats with filters
+    items_per_page_value = st.session_state.get("items_per_page", 10)
+
+    # Start over from the first page whenever the filters change
+    filters_key = (tuple(sorted(filters.items())), items_per_page_value)
+    if st.session_state.history_filters_key != filters_key:
+        st.session_state.history_filters_key = filters_key
+        st.session_state.page_number = 0
+        st.session_state.history_cursors = [None]
+
+    # Every sort pages by keyset cursor on (sort field, id)
+    cursor = st.session_state.history_cursors[st.session_state.page_number]
+    if cursor is not None:
+        filters.update(cursor)
+    chats = fetch_chat_history(limit=items_per_page_value, **filters)
+    
+    if chats is None:
+        st.error("⚠️ Cannot connect to backend. Please make sure the server is running (uv run backend/main.py)")
+    elif len(chats) == 0:
+        st.info("📭 No conversations found matching your filters.")
+    else:
+        st.success(f"📊 Showing {len(chats)} conversations")
         
-        response = requests.get(f"{BACKEND_URL}/chats/export/csv", params=params, timeout=30)
-        if response.status_code == 200:
-            return response.content
-        return None
-    except Exception as e:
-        st.error(f"Error exporting: {str(e)}")
-        return None
+        # Search box
+        search_term = st.text_input("🔍 Search conversations", placeholder="Type to search in messages...", key="search")
+        
+        # Search the most recent SEARCH_WINDOW chats matching the filters,
+        # not just this page; ignore single characters while typing
+        filtered_chats = chats
+        searching = len(search_term.strip()) >= SEARCH_MIN_CHARS
+        if searching:
+            search_filters = {k: v for k, v in filters.items() if not k.startswith("cursor_")}
+            window = fetch_chat_history(skip=0, limit=SEARCH_WINDOW, **search_filters) or []
+            matches = search_chats(window, search_term.strip())
+            filtered_chats = matches[:SEARCH_MAX_RESULTS]
+            if len(matches) > SEARCH_MAX_RESULTS:
+                st.caption(f"Found {len(matches)} matching conversations, showing the first {SEARCH_MAX_RESULTS}")
+            else:
+                st.caption(f"Found {len(matches)} matching conversations")
+        
+        # One virtualized table for the list; only the selected chat gets
+        # the full detail view and a Delete button
+        table = pd.DataFrame({
+            "ID": [chat["id"] for chat in filtered_chats],
+            "Time": [chat.get("timestamp_display") or str(chat.get("timestamp", "Unknown time")) for chat in filtered_chats],
+            "Sentiment": [sentiment_label(chat.get("sentiment_score")) for chat in filtered_chats],
+            "Tool": [TOOL_LABELS.get(chat.get("tool_called"), chat.get("tool_called") or "Chat") for chat in filtered_chats],
+            "Message": [
+                msg if len(msg) <= PREVIEW_CHARS else msg[:PREVIEW_CHARS - 3] + "..."
+                for msg in (chat.get("user_message") or "" for chat in filtered_chats)
+            ],
+        })
+        list_col, detail_col = st.columns([3, 2])
+        with list_col:
+            event = st.dataframe(
+                table,
+                on_select="rerun",
+                selection_mode="single-row",
+                hide_index=True,
+                width='stretch',
+                # A new key per set of rows, so a selection never carries
+                # over to a different chat on another page or search
+                key=f"history_table_{hash(tuple(table['ID']))}",
+            )
+        with detail_col:
+            selected = event.selection.rows
+            if selected and selected[0] < len(filtered_chats):
+                render_chat_detail(filtered_chats[selected[0]])
+            else:
+                st.caption("Select a conversation to see the full exchange.")
+        
+        # Pagination (search results are shown on one page)
+        if not searching:
+            col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
+            with col2:
+                if st.button("⬅️ Previous", disabled=st.session_state.page_number == 0):
+                    st.session_state.page_number -= 1
+                    st.rerun(scope="fragment")
+            with col4:
+                if st.button("Next ➡️", disabled=len(chats) < items_per_page_value):
+                    cursors = st.session_state.history_cursors
+                    del cursors[st.session_state.page_number + 1:]
+                    cursors.append(next_cursor(chats[-1], filters["sort_by"]))
+                    st.session_state.page_number += 1
+                    st.rerun(scope="fragment")
+            with col3:
+                st.caption(f"Page {st.session_state.page_number + 1}")
 
 # ==================== SIDEBAR FILTERS ====================
 
@@ -174,24 +409,37 @@ with st.sidebar:
     
     # Export button
     st.markdown("---")
-    if st.button("📥 Export to CSV", width='stretch'):
-        csv_data = export_to_csv(start_date, end_date)
-        if csv_data:
-            st.download_button(
-                label="Download CSV",
-                data=csv_data,
-                file_name=f"echomind_history_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv",
-                width='stretch'
-            )
+    if st.button("🔄 Refresh data", width='stretch'):
+        clear_swr_caches()
+        st.rerun()
+    # The browser downloads the backend's streamed CSV directly, without
+    # buffering the whole file in the Streamlit process first
+    st.link_button("📥 Export to CSV", export_csv_url(start_date, end_date), width='stretch')
 
 # ==================== MAIN CONTENT ====================
 
-# Tabs for different views
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["📋 Conversations", "📊 Analytics", "📈 Trends", "📅 Reports", "⚠️ Insights"])
+# Streamlit drops a widget's state once a run doesn't render it, so carry the
+# search term and trend period over while another view is selected
+for widget_key in ("search", "trend_days"):
+    if widget_key in st.session_state:
+        st.session_state[widget_key] = st.session_state[widget_key]
+
+# Unlike st.tabs, only the selected view's code runs on each rerun
+active_view = st.radio(
+    "View",
+    [CONVERSATIONS_VIEW, ANALYTICS_VIEW, TRENDS_VIEW, REPORTS_VIEW, INSIGHTS_VIEW],
+    horizontal=True,
+    key="active_view",
+    label_visibility="collapsed",
+)
+
+# The analytics views share a single dashboard fetch; the conversation
+# list doesn't need it
+if active_view != CONVERSATIONS_VIEW:
+    analytics = fetch_analytics(trend_days=st.session_state.get("trend_days", 30))
 
 # ==================== TAB 1: CONVERSATIONS ====================
-with tab1:
+if active_view == CONVERSATIONS_VIEW:
     # Prepare filters
     filters = {}
     if start_date:
@@ -217,123 +465,13 @@ with tab1:
     }
     filters["sort_by"] = sort_map.get(sort_by, "newest")
     
-    # Fetch chats with filters
-    items_per_page_value = st.session_state.get("items_per_page", 10)
-    skip = st.session_state.page_number * items_per_page_value
-    chats = fetch_chat_history(skip=skip, limit=items_per_page_value, **filters)
-    
-    if chats is None:
-        st.error("⚠️ Cannot connect to backend. Please make sure the server is running (uv run backend/main.py)")
-    elif len(chats) == 0:
-        st.info("📭 No conversations found matching your filters.")
-    else:
-        st.success(f"📊 Showing {len(chats)} conversations")
-        
-        # Search box
-        search_term = st.text_input("🔍 Search conversations", placeholder="Type to search in messages...", key="search")
-        
-        # Filter by search
-        filtered_chats = chats
-        if search_term:
-            search_lower = search_term.lower()
-            filtered_chats = [
-                chat for chat in chats
-                if search_lower in chat.get("user_message", "").lower() 
-                or search_lower in chat.get("assistant_response", "").lower()
-            ]
-            st.caption(f"Found {len(filtered_chats)} matching conversations")
-        
-        # Display conversations
-        for idx, chat in enumerate(filtered_chats):
-            # Parse timestamp
-            try:
-                if isinstance(chat.get("timestamp"), str):
-                    timestamp = datetime.fromisoformat(chat["timestamp"].replace("Z", "+00:00"))
-                else:
-                    timestamp = chat.get("timestamp", datetime.now())
-                formatted_time = timestamp.strftime("%B %d, %Y at %I:%M %p")
-            except:
-                formatted_time = str(chat.get("timestamp", "Unknown time"))
-            
-            # Sentiment indicator
-            sentiment_score = chat.get("sentiment_score")
-            sentiment_label = "Neutral"
-            sentiment_color = "gray"
-            if sentiment_score:
-                if sentiment_score > 0.05:
-                    sentiment_label = "Positive"
-                    sentiment_color = "green"
-                elif sentiment_score < -0.05:
-                    sentiment_label = "Negative"
-                    sentiment_color = "red"
-            
-            # Create expandable container
-            with st.expander(f"💬 Conversation #{chat['id']} - {formatted_time} | {sentiment_label}", expanded=False):
-                col1, col2, col3 = st.columns([3, 1, 1])
-                
-                with col1:
-                    st.markdown(f"**🕐 Time:** {formatted_time}")
-                    if sentiment_score is not None:
-                        st.markdown(f"**😊 Sentiment:** {sentiment_label} ({sentiment_score:.3f})")
-                    if chat.get("tool_called"):
-                        tool = chat["tool_called"]
-                        if tool == "speech_emotion":
-                            st.markdown("**🔧 Tool:** 🎧 Speech Emotion Analysis")
-                        elif tool == "facial_emotion":
-                            st.markdown("**🔧 Tool:** 😊 Facial Emotion Analysis")
-                        else:
-                            st.markdown(f"**🔧 Tool:** {tool}")
-                
-                with col2:
-                    st.caption(f"ID: {chat['id']}")
-                    if chat.get("conversation_length"):
-                        st.caption(f"Length: {chat['conversation_length']} chars")
-                
-                with col3:
-                    if st.button("🗑️ Delete", key=f"delete_{chat['id']}", width='stretch'):
-                        delete_chat(chat['id'])
-                
-                # User message
-                st.markdown("**👤 You:**")
-                st.info(chat.get("user_message", ""))
-                
-                # Assistant response
-                st.markdown("**🤖 EchoMind:**")
-                st.success(chat.get("assistant_response", ""))
-                
-                # Emotion data if available
-                emotion_data = chat.get("emotion_data")
-                if emotion_data:
-                    st.markdown("**🎭 Detected Emotions:**")
-                    emotions = emotion_data.get("emotions", [])
-                    if emotions:
-                        for em in emotions[:5]:  # Show top 5
-                            if isinstance(em, dict):
-                                label = em.get("emotion") or em.get("label", "unknown")
-                                score = em.get("score", 0.0)
-                                st.write(f"- **{label}**: {score:.2%}")
-                
-                st.divider()
-        
-        # Pagination
-        col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
-        with col2:
-            if st.button("⬅️ Previous", disabled=st.session_state.page_number == 0):
-                st.session_state.page_number -= 1
-                st.rerun()
-        with col4:
-            items_per_page_value = st.session_state.get("items_per_page", 10)
-            if st.button("Next ➡️", disabled=len(chats) < items_per_page_value):
-                st.session_state.page_number += 1
-                st.rerun()
-        with col3:
-            st.caption(f"Page {st.session_state.page_number + 1}")
+    render_conversations(filters)
 
 # ==================== TAB 2: ANALYTICS ====================
-with tab2:
+if active_view == ANALYTICS_VIEW:
     st.header("📊 Conversation Analytics")
     
-    stats = fetch_analytics_stats()
+    stats = analytics["stats"]
     if stats:
         # Key Metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -350,11 +488,10 @@ with tab2:
         if sentiment_dist:
             col1, col2 = st.columns(2)
             with col1:
-                fig_pie = px.pie(
-                    values=[sentiment_dist.get("positive", 0), sentiment_dist.get("neutral", 0), sentiment_dist.get("negative", 0)],
-                    names=["Positive", "Neutral", "Negative"],
-                    title="Sentiment Breakdown",
-                    color_discrete_map={"Positive": "green", "Neutral": "gray", "Negative": "red"}
+                fig_pie = build_sentiment_pie(
+                    sentiment_dist.get("positive", 0),
+                    sentiment_dist.get("neutral", 0),
+                    sentiment_dist.get("negative", 0)
                 )
                 st.plotly_chart(fig_pie, use_container_width=True)
             
@@ -367,95 +504,52 @@ with tab2:
         st.subheader("🔧 Tool Usage")
         tool_usage = stats.get("tool_usage", {})
         if tool_usage:
-            fig_bar = px.bar(
-                x=list(tool_usage.keys()),
-                y=list(tool_usage.values()),
-                title="Conversations by Tool",
-                labels={"x": "Tool", "y": "Count"}
-            )
+            fig_bar = build_count_bar(tool_usage, "Conversations by Tool", "Tool", "Count")
             st.plotly_chart(fig_bar, use_container_width=True)
         
         # Emotion Distribution
         st.subheader("🎭 Emotion Distribution")
-        emotion_dist = fetch_emotion_distribution()
+        emotion_dist = analytics["emotions"]
         if emotion_dist and emotion_dist.get("emotion_distribution"):
             emotions = emotion_dist["emotion_distribution"]
             if emotions:
-                fig_emotions = px.bar(
-                    x=list(emotions.keys()),
-                    y=list(emotions.values()),
-                    title="Detected Emotions (Speech & Facial)",
-                    labels={"x": "Emotion", "y": "Frequency"}
+                fig_emotions = build_count_bar(
+                    emotions, "Detected Emotions (Speech & Facial)", "Emotion", "Frequency"
                 )
                 st.plotly_chart(fig_emotions, use_container_width=True)
 
 # ==================== TAB 3: TRENDS ====================
-with tab3:
+if active_view == TRENDS_VIEW:
     st.header("📈 Sentiment Trends Over Time")
     
     days_option = st.selectbox("Time Period", [7, 14, 30, 60, 90], index=2, key="trend_days")
-    trends = fetch_sentiment_trends(days=days_option)
+    trends = analytics["trends"]
     
     if trends:
-        df = pd.DataFrame(trends)
-        df['date'] = pd.to_datetime(df['date'])
+        daily_sentiment = [row['avg_sentiment'] for row in trends]
         
         # Line chart
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=df['date'],
-            y=df['avg_sentiment'],
-            mode='lines+markers',
-            name='Average Sentiment',
-            line=dict(color='#667eea', width=2),
-            fill='tonexty',
-            fillcolor='rgba(102, 126, 234, 0.1)'
-        ))
-        fig.add_hline(y=0, line_dash="dash", line_color="gray", annotation_text="Neutral")
-        fig.update_layout(
-            title=f"Sentiment Trend (Last {days_option} Days)",
-            xaxis_title="Date",
-            yaxis_title="Sentiment Score (-1 to +1)",
-            hovermode='x unified'
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(build_trend_line(trends, days_option), use_container_width=True)
         
         # Calendar Heatmap (simplified)
         st.subheader("📅 Activity Heatmap")
-        df['day_of_week'] = df['date'].dt.day_name()
-        df['week'] = df['date'].dt.isocalendar().week
-        
-        heatmap_data = df.pivot_table(
-            values='count',
-            index='day_of_week',
-            columns='week',
-            aggfunc='sum',
-            fill_value=0
-        )
-        
-        fig_heatmap = px.imshow(
-            heatmap_data,
-            labels=dict(x="Week", y="Day of Week", color="Conversations"),
-            title="Conversation Activity Heatmap",
-            aspect="auto"
-        )
-        st.plotly_chart(fig_heatmap, use_container_width=True)
+        st.plotly_chart(build_heatmap(trends), use_container_width=True)
         
         # Summary stats
         col1, col2, col3 = st.columns(3)
-        col1.metric("Average Sentiment", f"{df['avg_sentiment'].mean():.3f}")
-        col2.metric("Total Conversations", int(df['count'].sum()))
-        col3.metric("Trend", "📈 Improving" if df['avg_sentiment'].iloc[-1] > df['avg_sentiment'].iloc[0] else "📉 Declining")
+        col1.metric("Average Sentiment", f"{sum(daily_sentiment) / len(daily_sentiment):.3f}")
+        col2.metric("Total Conversations", sum(row['count'] for row in trends))
+        col3.metric("Trend", "📈 Improving" if daily_sentiment[-1] > daily_sentiment[0] else "📉 Declining")
 
 # ==================== TAB 4: REPORTS ====================
-with tab4:
+if active_view == REPORTS_VIEW:
     st.header("📅 Weekly & Monthly Reports")
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("📊 Weekly Report")
-        weekly = fetch_weekly_report()
+        weekly = analytics["weekly"]
         if weekly:
             st.metric("Total Conversations", weekly.get("total_conversations", 0))
             st.metric("Average Sentiment", f"{weekly.get('average_sentiment', 0):.3f}")
@@ -468,7 +562,7 @@ with tab4:
     
     with col2:
         st.subheader("📅 Monthly Report")
-        monthly = fetch_monthly_report()
+        monthly = analytics["monthly"]
         if monthly:
             st.metric("Total Conversations", monthly.get("total_conversations", 0))
             st.metric("Average Sentiment", f"{monthly.get('average_sentiment', 0):.3f}")
@@ -478,10 +572,10 @@ with tab4:
             st.write(f"**Second Half Avg:** {monthly.get('second_half_avg', 0):.3f}")
 
 # ==================== TAB 5: INSIGHTS & WARNINGS ====================
-with tab5:
+if active_view == INSIGHTS_VIEW:
     st.header("⚠️ Mental Health Insights")
     
-    warnings = fetch_warning_signs()
+    warnings = analytics["warnings"]
     if warnings and warnings.get("warnings"):
         warning_list = warnings["warnings"]
         if warning_list:
@@ -502,10 +596,13 @@ with tab5:
     st.subheader("💡 Progress Indicators")
     
     # Get recent sentiment trend
-    recent_trends = fetch_sentiment_trends(days=14)
+    recent_trends = analytics["recent_trends"]
     if recent_trends and len(recent_trends) >= 2:
-        recent_avg = sum(t['avg_sentiment'] for t in recent_trends[:7]) / 7
-        older_avg = sum(t['avg_sentiment'] for t in recent_trends[7:14]) / 7 if len(recent_trends) >= 14 else recent_avg
+        # Trends come oldest first: compare the latest 7 active days with the 7 before
+        daily = np.fromiter((t['avg_sentiment'] for t in recent_trends), dtype=np.float64, count=len(recent_trends))
+        recent_avg = daily[-7:].mean()
+        older = daily[-14:-7]
+        older_avg = older.mean() if older.size else recent_avg
         
         if recent_avg > older_avg + 0.1:
             st.success("📈 **Positive Progress**: Your recent sentiment shows improvement compared to the previous week!")
@@ -516,22 +613,56 @@ with tab5:
 
 # ==================== SUMMARY FEATURE (Existing) ====================
 st.markdown("---")
-if st.button("📊 Generate AI Summary", width='stretch', type="primary"):
-    chats = fetch_chat_history(limit=100)
-    if chats:
-        try:
-            chat_data = [{"id": c["id"], "user_message": c.get("user_message", ""), 
-                         "assistant_response": c.get("assistant_response", ""), 
-                         "tool_called": c.get("tool_called"), "timestamp": c.get("timestamp")} 
-                        for c in chats]
-            response = requests.post(f"{BACKEND_URL}/summarize", json={"chats": chat_data}, timeout=120)
-            if response.status_code == 200:
-                summary = response.json().get("summary", "")
-                st.info(summary)
+col1, col2 = st.columns([4, 1])
+with col1:
+    generate = st.button("📊 Generate AI Summary", width='stretch', type="primary")
+with col2:
+    # Skip the cached summary and ask the LLM again
+    regenerate = st.button("🔁 Regenerate", width='stretch', disabled=not st.session_state.summary_cache)
+if generate or regenerate:
+    lines = []
+    try:
+        # Pass the newest chats straight from the /chats stream to /summarize
+        # as gzipped NDJSON, without decoding them here
+        with session.get(STREAM_CHATS_URL, params={"limit": 100}, stream=True, timeout=10) as chats_response:
+            if chats_response.status_code == 200:
+                lines = [line for line in chats_response.iter_lines() if line]
             else:
-                st.error("Failed to generate summary")
-        except Exception as e:
-            st.error(f"Error: {str(e)}")
+                st.error(f"Failed to load chat history: {chats_response.status_code}")
+    except requests.exceptions.ConnectionError:
+        st.error("⚠️ Cannot connect to backend. Please make sure the server is running (uv run backend/main.py)")
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error loading chat history: {str(e)}")
+    if lines:
+        body = b"\n".join(lines)
+        # The same chats always get the same summary, so only call the LLM
+        # again when the history changed or the user asked to regenerate
+        key = hashlib.blake2b(body, digest_size=16).hexdigest()
+        summary_cache = st.session_state.summary_cache
+        if key in summary_cache and not regenerate:
+            st.session_state.summary_text = summary_cache[key]
+        else:
+            try:
+                response = session.post(
+                    SUMMARIZE_URL,
+                    data=gzip.compress(body),
+                    headers=NDJSON_GZIP_HEADERS,
+                    timeout=120,
+                )
+                if response.status_code == 200:
+                    summary = decode_json(response).get("summary", "")
+                    summary_cache.pop(key, None)
+                    summary_cache[key] = summary
+                    while len(summary_cache) > SUMMARY_CACHE_SIZE:
+                        summary_cache.pop(next(iter(summary_cache)))
+                    st.session_state.summary_text = summary
+                else:
+                    st.error("Failed to generate summary")
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
+# Keep showing the latest summary across reruns
+if st.session_state.summary_text:
+    st.info(st.session_state.summary_text)
 
 # Navigation
 col1, col2 = st.columns([5, 1])